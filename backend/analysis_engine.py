@@ -1,10 +1,23 @@
 import asyncio
 import json
 import re
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional
 from dataclasses import dataclass
 from datetime import datetime
 import uuid
+from category_index import CategoryIndex
+
+# 分析阶段：阶段名称、开始时的提示
+ANALYSIS_STAGES = [
+    ("category", "正在识别市场类别..."),
+    ("market_trends", "正在分析市场趋势..."),
+    ("user_profiles", "正在分析用户画像..."),
+    ("competition", "正在分析竞争格局..."),
+    ("strategic_recommendations", "正在生成战略建议...")
+]
+
+# 进度回调：阶段名称、提示、已完成阶段的百分比
+ProgressCallback = Callable[[str, str, int], None]
 
 @dataclass
 class DataSource:
@@ -26,7 +39,10 @@ class InsightPoint:
 class MarketInsightEngine:
     """市场洞察分析引擎 - 优化版本"""
     
-    def __init__(self):
+    def __init__(self, category_index: Optional[CategoryIndex] = None):
+        # 品牌-市场类别索引，启动时加载一次
+        self.category_index = category_index or CategoryIndex.from_file()
+
         # 预定义具体的数据源URL
         self.data_sources = {
             "market_data": [
@@ -48,32 +64,11 @@ class MarketInsightEngine:
     
     def identify_market_category(self, url: str) -> str:
         """识别URL对应的市场类别"""
-        url_lower = url.lower()
-        
-        # 市场类别映射
-        category_mapping = {
-            "apple": "智能手机市场",
-            "samsung": "智能手机市场", 
-            "xiaomi": "智能手机市场",
-            "huawei": "智能手机市场",
-            "tesla": "电动汽车市场",
-            "nike": "运动鞋服市场",
-            "adidas": "运动鞋服市场",
-            "amazon": "电商平台市场",
-            "alibaba": "电商平台市场",
-            "netflix": "流媒体市场",
-            "spotify": "音乐流媒体市场",
-            "uber": "网约车市场",
-            "airbnb": "短租住宿市场",
-            "starbucks": "咖啡连锁市场",
-            "mcdonalds": "快餐连锁市场"
-        }
-        
-        for keyword, category in category_mapping.items():
-            if keyword in url_lower:
-                return category
-        
-        return "通用消费品市场"
+        return self.category_index.classify(url)
+
+    def identify_market_categories(self, urls: List[str]) -> List[str]:
+        """批量识别URL对应的市场类别"""
+        return self.category_index.classify_many(urls)
     
     def get_market_data(self, category: str) -> Dict[str, Any]:
         """按需获取市场数据"""
@@ -487,18 +482,34 @@ class MarketInsightEngine:
             ]
         }
     
-    async def analyze_url(self, url: str) -> Dict[str, Any]:
-        """主分析函数 - 优化版本"""
+    async def analyze_url(self, url: str, progress_callback: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """
+        主分析函数 - 优化版本
+        
+        Args:
+            url: 要分析的网址
+            progress_callback: 每个分析阶段开始时调用，参数为阶段名称、提示和已完成阶段的百分比
+        """
+        def report(index: int):
+            if progress_callback is not None:
+                stage, message = ANALYSIS_STAGES[index]
+                progress_callback(stage, message, index * 100 // len(ANALYSIS_STAGES))
         
+        # 各阶段在线程中执行，阶段之间让出事件循环，状态查询能看到每个阶段的进度
         # 识别市场类别
-        category = self.identify_market_category(url)
+        report(0)
+        category = await asyncio.to_thread(self.identify_market_category, url)
         
         # 按需生成各项分析
-        market_trends = self.generate_market_trends(category)
-        user_profiles = self.generate_user_profiles(category)
-        competition = self.generate_competition_analysis(category)
-        strategic_recommendations = self.generate_strategic_recommendations(
-            category, user_profiles, competition
+        report(1)
+        market_trends = await asyncio.to_thread(self.generate_market_trends, category)
+        report(2)
+        user_profiles = await asyncio.to_thread(self.generate_user_profiles, category)
+        report(3)
+        competition = await asyncio.to_thread(self.generate_competition_analysis, category)
+        report(4)
+        strategic_recommendations = await asyncio.to_thread(
+            self.generate_strategic_recommendations, category, user_profiles, competition
         )
         
         return {
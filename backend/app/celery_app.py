@@ -1,4 +1,5 @@
 from celery import Celery
+from kombu import Queue
 from app.core.config import settings
 
 # 创建Celery实例
@@ -6,7 +7,7 @@ celery_app = Celery(
     "market_intelligence",
     broker=settings.REDIS_URL,
     backend=settings.REDIS_URL,
-    include=["app.services.market_analyzer", "app.services.user_analyzer", "app.services.competitor_analyzer"]
+    include=["app.tasks"]
 )
 
 # Celery配置
@@ -19,4 +20,14 @@ celery_app.conf.update(
     task_track_started=True,
     task_time_limit=30 * 60,  # 30分钟
     task_soft_time_limit=25 * 60,  # 25分钟
-) 
\ No newline at end of file
+    # 准备和汇总任务使用默认队列，各分析器使用单独的队列，可以按队列分配 Worker
+    task_default_queue="analysis",
+    task_queues=[Queue("analysis"), Queue("market"), Queue("user"), Queue("competitor")],
+    # 分析任务耗时长：执行完成后再确认，Worker 异常退出时重新投递；每个进程只预取一个任务
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    # 任务以等待网络和LLM为主，并发数可高于CPU核数
+    worker_concurrency=settings.CELERY_WORKER_CONCURRENCY,
+    result_expires=settings.CACHE_TTL,
+)
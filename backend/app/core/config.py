@@ -16,8 +16,20 @@ class Settings(BaseSettings):
     # Redis配置
     REDIS_URL: str = "redis://localhost:6379"
     
+    # Celery配置
+    CELERY_ENABLED: bool = False  # 分析任务交给 Celery Worker 执行，需要单独启动 Worker
+    CELERY_WORKER_CONCURRENCY: int = 16  # 分析以等待网络和LLM为主，并发数可高于CPU核数
+    
     # OpenAI配置
     OPENAI_API_KEY: str = ""
+    LLM_MODEL: str = "gpt-4"
+    LLM_MAX_TOKENS: int = 2000
+    LLM_MAX_CONCURRENCY: int = 8  # 进程内同时进行的LLM请求上限
+    LLM_TIMEOUT: float = 60.0  # 单次调用超时（秒），不含等待并发名额的时间
+    LLM_MAX_RETRIES: int = 2
+    LLM_JSON_MODE: bool = False  # 使用 response_format=json_object，需要模型支持（如 gpt-4-1106-preview）
+    STRUCTURED_OUTPUT_RETRIES: int = 1  # 输出无法解析为JSON时单个阶段的重试次数
+    PROMPT_MAX_INPUT_TOKENS: int = 3000  # 单次调用的输入token预算，超出时缩减网页摘录和上下文列表
     
     # 外部API配置
     MARKET_DATA_API_KEY: Optional[str] = None
@@ -33,10 +45,58 @@ class Settings(BaseSettings):
     # 分析配置
     MAX_ANALYSIS_DURATION: int = 300  # 秒
     MAX_CONTENT_LENGTH: int = 10000   # 字符
+    ANALYSIS_STAGE_TIMEOUT: float = 120.0  # 单个分析阶段的超时（秒）
+    PROGRESS_HEARTBEAT_INTERVAL: float = 15.0  # 进度推送连接的心跳间隔（秒）
+    LONG_POLL_MAX_WAIT: float = 30.0  # 状态查询长轮询的最长等待（秒），需小于反向代理的读超时
+    ANALYSIS_COALESCING_ENABLED: bool = True  # 合并同时提交的相同分析（配置 Redis 时跨进程合并）
+    # 竞争对手优势/劣势分析："batch" 一次请求分析全部竞争对手；"concurrent" 逐个并发请求
+    COMPETITOR_ENRICHMENT_MODE: str = "batch"
+    
+    # 提交任务时的URL可访问性检查：
+    # "head" 发送 HEAD 或单字节范围请求；"get" 完整抓取并留给分析复用；"skip" 交由后台任务检查
+    ADMISSION_CHECK_MODE: str = "head"
+    ADMISSION_TIMEOUT: float = 3.0  # 秒
     
     # 缓存配置
     CACHE_TTL: int = 3600  # 秒
     
+    # LLM响应缓存配置（有效期使用 CACHE_TTL）
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MAX_ENTRIES: int = 1024  # 进程内 LRU 条目上限
+    LLM_CACHE_REDIS_ENABLED: bool = True  # 使用 REDIS_URL 作为共享缓存
+    
+    # 内容指纹复用配置：网页内容未变化时直接返回最近的分析结果
+    FINGERPRINT_REUSE_ENABLED: bool = True
+    FINGERPRINT_MAX_DISTANCE: int = 3  # SimHash 汉明距离上限，0 表示只复用完全相同的内容
+    FINGERPRINT_MAX_AGE: int = 24 * 3600  # 秒
+    
+    # HTTP客户端配置
+    HTTP_TIMEOUT: float = 30.0  # 秒
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0  # 秒
+    HTTP_ENABLE_HTTP2: bool = True  # 需要安装 h2
+    
+    # 网页抓取配置
+    FETCH_BYTES_PER_CHAR: int = 100  # 下载字节预算 = MAX_CONTENT_LENGTH × 该系数
+    FETCH_MAX_DECOMPRESSED_BYTES: int = 4 * 1024 * 1024  # 解压后字节上限
+    FETCH_MAX_CONCURRENCY: int = 50  # 全局并发请求上限
+    FETCH_PER_HOST_CONCURRENCY: int = 4  # 同一主机并发请求上限
+    FETCH_HOST_MIN_INTERVAL: float = 0.25  # 同一主机两次请求的最小间隔（秒）
+    
+    # 站内多页面抓取配置
+    CRAWL_MAX_PAGES: int = 6  # 含首页
+    CRAWL_MAX_BYTES: int = 5 * 1024 * 1024  # 单个任务的下载字节预算
+    CRAWL_MAX_DEPTH: int = 1  # 从首页出发的链接层数
+    CRAWL_MAX_FRONTIER: int = 200  # 候选页面队列上限
+    CRAWL_CONCURRENCY: int = 4
+    CRAWL_SITEMAP_MAX_BYTES: int = 512 * 1024
+    
+    # 网页磁盘缓存配置（有效期使用 CACHE_TTL）
+    HTTP_CACHE_ENABLED: bool = True
+    HTTP_CACHE_DIR: str = ".cache/http"
+    HTTP_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
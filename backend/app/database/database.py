@@ -1,8 +1,10 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, JSON, Enum, Boolean
+from sqlalchemy import create_engine, inspect, text, Column, Integer, String, DateTime, Text, JSON, Enum, Boolean
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from datetime import datetime
+from datetime import datetime, timedelta
 from app.core.config import settings
+from app.services.fingerprint import hamming_distance
+from app.services.progress_bus import get_progress_bus
 from app.models.analysis import AnalysisStatus, AnalysisType
 import enum
 
@@ -21,7 +23,7 @@ class AnalysisModel(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(String, unique=True, index=True)
-    url = Column(String, nullable=False)
+    url = Column(String, nullable=False, index=True)
     analysis_type = Column(Enum(AnalysisType), default=AnalysisType.FULL)
     status = Column(Enum(AnalysisStatus), default=AnalysisStatus.PENDING)
     result = Column(JSON, nullable=True)
@@ -29,6 +31,10 @@ class AnalysisModel(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
     progress = Column(Integer, default=0)
+    content_hash = Column(String(64), nullable=True)  # 规范化正文的 SHA-256
+    simhash = Column(String(16), nullable=True)  # 正文 SimHash（十六进制）
+    sections = Column(JSON, nullable=True)  # 各分析部分的状态，如 {"market_trends": "completed"}
+    version = Column(Integer, default=0)  # 状态版本号，每次状态变化加一
     
     def __repr__(self):
         return f"<Analysis(task_id='{self.task_id}', status='{self.status}')>"
@@ -66,8 +72,25 @@ class AnalysisHistoryModel(Base):
 
 # 创建数据库表
 def create_tables():
-    """创建数据库表"""
+    """
+    创建数据库表，并为已存在的表补充模型中新增的列和索引
+
+    create_all 不会修改已存在的表：新增的列（如内容指纹、分析部分状态、状态版本号）
+    以可为空的列加入，已有记录的值为 NULL。
+    """
     Base.metadata.create_all(bind=engine)
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        with engine.begin() as conn:
+            for column in table.columns:
+                if column.name not in columns:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(bind=engine)
 
 # 获取数据库会话
 def get_db():
@@ -79,7 +102,39 @@ def get_db():
         db.close()
 
 # 数据库操作函数
-def save_analysis_result(db, task_id: str, result: dict, status: AnalysisStatus, message: str):
+def progress_event(analysis, section: str = None) -> dict:
+    """任务状态事件，字段与状态查询接口一致；section 为本次完成的分析部分"""
+    return {
+        "task_id": analysis.task_id,
+        "version": analysis.version or 0,
+        "status": AnalysisStatus(analysis.status).value,
+        "message": analysis.message,
+        "progress": analysis.progress,
+        "sections": analysis.sections,
+        "section": section,
+        "result": analysis.result,
+        "created_at": analysis.created_at.isoformat() if analysis.created_at else None,
+        "completed_at": analysis.completed_at.isoformat() if analysis.completed_at else None
+    }
+
+def _touch(analysis, section: str = None) -> dict:
+    """递增状态版本号，返回提交后要发布的事件"""
+    analysis.version = (analysis.version or 0) + 1
+    return progress_event(analysis, section)
+
+def _publish(*events: dict):
+    for event in events:
+        get_progress_bus().publish(event)
+
+def create_analysis_task(db, task_id: str, url: str, analysis_type: AnalysisType):
+    """创建分析任务记录"""
+    analysis = AnalysisModel(task_id=task_id, url=url, analysis_type=analysis_type,
+                             status=AnalysisStatus.PENDING, message="分析任务已启动")
+    db.add(analysis)
+    db.commit()
+    return analysis
+
+def save_analysis_result(db, task_id: str, result: dict, status: AnalysisStatus, message: str, fingerprint: dict = None):
     """保存分析结果"""
     analysis = db.query(AnalysisModel).filter(AnalysisModel.task_id == task_id).first()
     if analysis:
@@ -88,9 +143,77 @@ def save_analysis_result(db, task_id: str, result: dict, status: AnalysisStatus,
         analysis.message = message
         analysis.completed_at = datetime.utcnow()
         analysis.progress = 100
+        if status == AnalysisStatus.COMPLETED and result:
+            analysis.sections = {**(analysis.sections or {}), **{name: AnalysisStatus.COMPLETED.value for name in result}}
+        if fingerprint:
+            analysis.content_hash = fingerprint["content_hash"]
+            analysis.simhash = fingerprint["simhash"]
+        event = _touch(analysis)
+        db.commit()
+        _publish(event)
+    return analysis
+
+def update_analysis_sections(db, task_id: str, sections: dict, section: str = None, value=None):
+    """更新各分析部分的状态，并保存已完成部分的结果；进度按已结束（完成或失败）的部分计算"""
+    analysis = db.query(AnalysisModel).filter(AnalysisModel.task_id == task_id).first()
+    if analysis:
+        # JSON 列需要赋值新对象才会被识别为已修改
+        analysis.sections = dict(sections)
+        if section is not None:
+            analysis.result = {**(analysis.result or {}), section: value}
+        finished = (AnalysisStatus.COMPLETED.value, AnalysisStatus.FAILED.value)
+        done = sum(1 for status in sections.values() if status in finished)
+        analysis.progress = done * 100 // max(len(sections), 1)
+        event = _touch(analysis, section)
         db.commit()
+        _publish(event)
     return analysis
 
+def update_analysis_section(db, task_id: str, section: str, status: AnalysisStatus, value=None):
+    """更新单个分析部分的状态和结果，多个 Worker 并发更新同一任务时按行加锁"""
+    analysis = db.query(AnalysisModel).filter(AnalysisModel.task_id == task_id).with_for_update().first()
+    if analysis is None:
+        return None
+    sections = {**(analysis.sections or {}), section: status.value}
+    return update_analysis_sections(db, task_id, sections, section if value is not None else None, value)
+
+def copy_analysis_result(db, source_task_id: str, task_ids: list):
+    """将一个任务的最终结果写入其他任务（合并的相同分析）"""
+    source = db.query(AnalysisModel).filter(AnalysisModel.task_id == source_task_id).first()
+    if source is None or not task_ids:
+        return
+    events = []
+    for analysis in db.query(AnalysisModel).filter(AnalysisModel.task_id.in_(task_ids)).all():
+        analysis.result = source.result
+        analysis.status = source.status
+        analysis.message = source.message
+        analysis.completed_at = source.completed_at
+        analysis.progress = source.progress
+        analysis.content_hash = source.content_hash
+        analysis.simhash = source.simhash
+        analysis.sections = source.sections
+        events.append(_touch(analysis))
+    db.commit()
+    _publish(*events)
+
+def find_reusable_analysis(db, url: str, analysis_type: AnalysisType, fingerprint: dict, max_distance: int, max_age: int):
+    """查找同一URL最近完成且内容指纹相同或相近的分析"""
+    candidates = db.query(AnalysisModel).filter(
+        AnalysisModel.url == url,
+        AnalysisModel.analysis_type == analysis_type,
+        AnalysisModel.status == AnalysisStatus.COMPLETED,
+        AnalysisModel.simhash.isnot(None),
+        AnalysisModel.completed_at >= datetime.utcnow() - timedelta(seconds=max_age)
+    ).order_by(AnalysisModel.completed_at.desc()).limit(20).all()
+    
+    for analysis in candidates:
+        if analysis.content_hash == fingerprint["content_hash"]:
+            return analysis
+    for analysis in candidates:
+        if hamming_distance(int(analysis.simhash, 16), int(fingerprint["simhash"], 16)) <= max_distance:
+            return analysis
+    return None
+
 def update_analysis_status(db, task_id: str, status: AnalysisStatus, message: str, progress: int = None):
     """更新分析状态"""
     analysis = db.query(AnalysisModel).filter(AnalysisModel.task_id == task_id).first()
@@ -99,7 +222,9 @@ def update_analysis_status(db, task_id: str, status: AnalysisStatus, message: st
         analysis.message = message
         if progress is not None:
             analysis.progress = progress
+        event = _touch(analysis)
         db.commit()
+        _publish(event)
     return analysis
 
 def get_analysis_by_task_id(db, task_id: str):
@@ -21,6 +21,8 @@ class AnalysisRequest(BaseModel):
     """分析请求模型"""
     url: HttpUrl = Field(..., description="要分析的网址")
     analysis_type: AnalysisType = Field(default=AnalysisType.FULL, description="分析类型")
+    crawl: bool = Field(default=False, description="是否同时抓取定价、关于、产品等站内页面")
+    force_refresh: bool = Field(default=False, description="忽略内容未变化时可复用的结果和LLM响应缓存，强制重新分析")
     custom_parameters: Optional[Dict[str, Any]] = Field(default=None, description="自定义分析参数")
 
 class MarketTrends(BaseModel):
@@ -55,8 +57,8 @@ class AnalysisResult(BaseModel):
     market_trends: Optional[MarketTrends] = Field(default=None, description="市场趋势分析")
     user_profile: Optional[UserProfile] = Field(default=None, description="用户画像分析")
     competitor_analysis: Optional[CompetitorAnalysis] = Field(default=None, description="竞争分析")
-    summary: str = Field(..., description="分析总结")
-    recommendations: List[str] = Field(..., description="建议和洞察")
+    summary: str = Field(default="", description="分析总结")
+    recommendations: List[str] = Field(default_factory=list, description="建议和洞察")
 
 class AnalysisResponse(BaseModel):
     """分析响应模型"""
@@ -67,6 +69,8 @@ class AnalysisResponse(BaseModel):
     created_at: datetime = Field(..., description="创建时间")
     completed_at: Optional[datetime] = Field(default=None, description="完成时间")
     progress: Optional[int] = Field(default=None, description="进度百分比")
+    sections: Optional[Dict[str, AnalysisStatus]] = Field(default=None, description="各分析部分的状态，已完成部分的结果随 result 提前返回")
+    version: Optional[int] = Field(default=None, description="状态版本号，每次状态变化加一")
 
 class AnalysisHistory(BaseModel):
     """分析历史记录"""
@@ -0,0 +1,137 @@
+import hashlib
+from typing import Dict, List, Optional
+from app.core.config import settings
+from app.services.redis_client import get_redis, mark_redis_failed
+from app.services.url_utils import normalize_url
+
+REDIS_KEY_PREFIX = "coalesce:"
+
+# 锁仍由该领头任务持有时才追加跟随任务；跟随列表与锁同样过期，领头任务异常退出时不会残留
+JOIN_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('RPUSH', KEYS[2], ARGV[2])
+    redis.call('EXPIRE', KEYS[2], ARGV[3])
+    return 1
+end
+return 0
+"""
+
+# 释放锁并取出全部跟随任务；之后到达的提交会成为新的领头任务
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+end
+local followers = redis.call('LRANGE', KEYS[2], 0, -1)
+redis.call('DEL', KEYS[2])
+return followers
+"""
+
+
+def coalesce_key(url: str, analysis_type: str, crawl: bool = False) -> str:
+    """相同分析的合并键：规范化URL、分析类型和是否站内抓取"""
+    return f"{normalize_url(url) or url}|{analysis_type}|{int(crawl)}"
+
+
+class AnalysisCoalescer:
+    """
+    相同分析请求合并
+
+    同一URL和分析类型的分析进行中时，新提交的任务不再启动分析，而是挂到
+    进行中的领头任务上，领头任务完成后把结果写入每个跟随任务。
+    进程内用字典登记；配置了 Redis 时用带过期时间的锁在多个进程、Worker 之间合并。
+    local 为 False 时只通过 Redis 合并，用于提交和完成不在同一进程的情况（Celery）。
+    """
+
+    def __init__(self, lock_ttl: int, local: bool = True):
+        self.lock_ttl = lock_ttl
+        self.local = local
+        self._leaders: Dict[str, str] = {}
+        self._followers: Dict[str, List[str]] = {}
+        self._redis_leaders: Dict[str, str] = {}  # 通过 Redis 获得锁的合并键（仅 local 模式）
+
+    async def join(self, key: str, task_id: str) -> Optional[str]:
+        """
+        登记一个新任务
+
+        Returns:
+            Optional[str]: 已有相同分析进行中时返回领头任务ID，任务成为跟随任务；
+                返回 None 表示该任务成为领头任务，需要执行分析并在结束后调用 release()
+        """
+        leader = self._leaders.get(key)
+        if leader is not None:
+            self._followers[key].append(task_id)
+            return leader
+
+        leader = await self._join_redis(key, task_id)
+        if leader is not None or not self.local:
+            return leader
+
+        self._leaders[key] = task_id
+        self._followers[key] = []
+        return None
+
+    async def release(self, key: str, task_id: str) -> List[str]:
+        """领头任务结束，返回需要写入相同结果的跟随任务ID"""
+        if not self.local:
+            return await self._release_redis(key, task_id)
+        if self._leaders.get(key) != task_id:
+            return []
+        del self._leaders[key]
+        followers = self._followers.pop(key, [])
+
+        if self._redis_leaders.pop(key, None) == task_id:
+            followers.extend(await self._release_redis(key, task_id))
+        return followers
+
+    async def _release_redis(self, key: str, task_id: str) -> List[str]:
+        """释放 Redis 锁并取出其他进程登记的跟随任务"""
+        redis = get_redis()
+        if redis is None:
+            return []
+        lock_key, followers_key = self._redis_keys(key)
+        try:
+            remote = await redis.eval(RELEASE_SCRIPT, 2, lock_key, followers_key, task_id)
+        except Exception:
+            mark_redis_failed()
+            return []
+        return [item.decode("utf-8") for item in remote]
+
+    async def _join_redis(self, key: str, task_id: str) -> Optional[str]:
+        """通过 Redis 锁合并其他进程中的相同分析，Redis 不可用时返回 None"""
+        redis = get_redis()
+        if redis is None:
+            return None
+
+        lock_key, followers_key = self._redis_keys(key)
+        try:
+            for _ in range(3):
+                if await redis.set(lock_key, task_id, nx=True, ex=self.lock_ttl):
+                    # 非 local 模式下由 Worker 释放锁，提交进程不保留记录
+                    if self.local:
+                        self._redis_leaders[key] = task_id
+                    return None
+                leader = await redis.get(lock_key)
+                if leader is None:
+                    continue
+                leader = leader.decode("utf-8")
+                if await redis.eval(JOIN_SCRIPT, 2, lock_key, followers_key, leader, task_id, self.lock_ttl):
+                    return leader
+        except Exception:
+            mark_redis_failed()
+        return None
+
+    @staticmethod
+    def _redis_keys(key: str):
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return f"{REDIS_KEY_PREFIX}{digest}", f"{REDIS_KEY_PREFIX}{digest}:followers"
+
+
+_analysis_coalescer: Optional[AnalysisCoalescer] = None
+
+
+def get_analysis_coalescer() -> AnalysisCoalescer:
+    """获取进程内共享的分析请求合并器"""
+    global _analysis_coalescer
+    if _analysis_coalescer is None:
+        _analysis_coalescer = AnalysisCoalescer(settings.MAX_ANALYSIS_DURATION * 2, local=not settings.CELERY_ENABLED)
+    return _analysis_coalescer
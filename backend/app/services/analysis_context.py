@@ -0,0 +1,117 @@
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, Optional
+from app.services.content_store import ContentStore
+from app.services.llm_gateway import get_llm_gateway
+from app.services.prompt_builder import build_prompt, count_tokens, dedupe_sentences, Excerpt
+from app.services.structured_output import request_json, object_schema, STRING_LIST_SCHEMA
+
+INDUSTRY_SYSTEM_PROMPT = "你是一个专业的行业分析师，擅长识别企业所属的行业、产品和市场。"
+INDUSTRY_SCHEMA = object_schema(
+    industry_name={"type": "string"},
+    industry_category={"type": "string"},
+    key_products=STRING_LIST_SCHEMA,
+    target_market={"type": "string"},
+    market_players=STRING_LIST_SCHEMA
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisContext:
+    """
+    单个分析任务的共享上下文
+
+    网页内容、行业信息、社交媒体数据等中间结果由多个分析器共用，
+    每项在同一任务内只计算一次，并发请求共享同一次计算。
+    分析器通过 requires 声明需要的中间结果。
+    artifacts 传入其他进程已计算好的中间结果（如 Celery 流水线的准备阶段）。
+    """
+
+    def __init__(self, url: str, content_store: Optional[ContentStore] = None,
+                 artifacts: Optional[Dict[str, Any]] = None):
+        self.url = url
+        self.content_store = content_store or ContentStore()
+        self._artifacts: Dict[str, asyncio.Task] = {}
+        self._preloaded: Dict[str, Any] = dict(artifacts or {})
+
+    async def get(self, name: str) -> Any:
+        """获取中间结果，首次访问时计算"""
+        if name in self._preloaded:
+            return self._preloaded[name]
+        task = self._artifacts.get(name)
+        if task is None:
+            build = getattr(self, f"_build_{name}", None)
+            if build is None:
+                raise KeyError(f"未知的分析中间结果: {name}")
+            task = asyncio.ensure_future(build())
+            self._artifacts[name] = task
+        return await asyncio.shield(task)
+
+    async def require(self, names: Iterable[str]) -> Dict[str, Any]:
+        """并发获取多个中间结果"""
+        names = list(names)
+        values = await asyncio.gather(*(self.get(name) for name in names))
+        return dict(zip(names, values))
+
+    async def _build_website_content(self) -> Dict[str, Any]:
+        """网页内容及关键词，正文去掉重复句子后供各阶段共用"""
+        page = await self.content_store.get_bundle(self.url)
+        content = dedupe_sentences(page["content"])
+        raw_tokens = count_tokens(page["content"])
+        tokens = count_tokens(content)
+        logger.info("website content %s: %d tokens (raw %d, saved %d)", self.url, tokens, raw_tokens, raw_tokens - tokens)
+        return {
+            "title": page["title"],
+            "description": page["description"],
+            "content": content,
+            "user_keywords": page["keywords"]["user"],
+            "competitor_keywords": page["keywords"]["competitor"],
+            "url": self.url
+        }
+
+    async def _build_industry_info(self) -> Dict[str, Any]:
+        """识别行业类别"""
+        content = await self.get("website_content")
+        prompt = build_prompt("industry_info", """
+        基于以下网站信息，识别该网站所属的行业类别：
+
+        URL: {url}
+        标题: {title}
+        描述: {description}
+        内容摘要: {content}
+
+        请返回JSON格式的行业信息，包含：
+        - industry_name: 行业名称
+        - industry_category: 行业分类
+        - key_products: 主要产品/服务
+        - target_market: 目标市场
+        - market_players: 主要市场参与者
+        """, url=self.url, title=content['title'], description=content['description'],
+            content=Excerpt(content['content'], 1000), schema=INDUSTRY_SCHEMA)
+
+        try:
+            return await request_json(get_llm_gateway(), prompt, INDUSTRY_SYSTEM_PROMPT)
+        except Exception:
+            # 行业信息只作为辅助上下文，调用或解析失败时按未知行业继续
+            return {}
+
+    async def _build_social_data(self) -> Dict[str, Any]:
+        """收集社交媒体数据"""
+        # 这里可以集成社交媒体API
+        # 目前返回模拟数据
+        return {
+            "social_presence": {
+                "facebook": {"followers": 10000, "engagement_rate": 2.5},
+                "twitter": {"followers": 5000, "engagement_rate": 3.2},
+                "linkedin": {"followers": 8000, "engagement_rate": 1.8}
+            },
+            "user_sentiment": {
+                "positive": 65,
+                "neutral": 25,
+                "negative": 10
+            },
+            "top_mentions": [
+                "great product", "easy to use", "good value", "needs improvement"
+            ]
+        }
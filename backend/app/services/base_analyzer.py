@@ -0,0 +1,36 @@
+import copy
+from typing import Dict, Any, Tuple
+from app.services.llm_gateway import get_llm_gateway
+from app.services.structured_output import request_json
+
+
+class BaseAnalyzer:
+    """
+    分析器基类
+
+    子类提供系统提示词和LLM调用失败时的默认结果，LLM请求统一经过共享网关。
+    requires 声明需要从任务上下文（AnalysisContext）获取的中间结果。
+    """
+
+    system_prompt: str = ""
+    requires: Tuple[str, ...] = ("website_content",)
+    fallback_response: Dict[str, Any] = {}
+
+    def __init__(self):
+        self.llm = get_llm_gateway()
+
+    async def _call_json(self, prompt: str, default: Any) -> Any:
+        """
+        调用LLM并解析JSON
+
+        LLM调用失败、超时或输出重试后仍无法解析时返回本阶段的默认结果，
+        不影响同一分析器的其他阶段。
+
+        Args:
+            prompt: 已包含输出格式要求的提示词（build_prompt(schema=...) 或 with_schema()）
+            default: 本阶段的默认结果，形状与本阶段的输出相同
+        """
+        try:
+            return await request_json(self.llm, prompt, self.system_prompt)
+        except Exception:
+            return copy.deepcopy(default)
@@ -1,136 +1,119 @@
-import httpx
 import asyncio
-from typing import Dict, Any, List
-from bs4 import BeautifulSoup
-import openai
+from typing import Dict, Any, List, Optional
 from app.core.config import settings
+from app.services.base_analyzer import BaseAnalyzer
+from app.services.stage_graph import Stage, run_stages
+from app.services.prompt_builder import build_prompt, Excerpt, JsonContext
+from app.services.structured_output import model_schema, object_schema, with_schema, STRING_LIST_SCHEMA
 from app.models.analysis import CompetitorAnalysis
-import json
-import re
-from urllib.parse import urlparse
+from app.services.analysis_context import AnalysisContext
 
-class CompetitorAnalyzer:
+# 各阶段提示词中保留的竞争对手字段
+COMPETITOR_FIELDS = {
+    "profile": ("name", "type", "description", "products", "website"),
+    "competitive_landscape": ("name", "type", "market_share"),
+    "product_comparison": ("name", "type", "description", "products", "strengths", "weaknesses"),
+    "marketing_strategies": ("name", "type", "description", "strengths"),
+    "competitive_advantages": ("name", "strengths", "weaknesses"),
+    "market_positioning": ("name", "type", "description", "market_share")
+}
+
+# 各阶段的输出格式，由结果模型生成
+OUTPUT_SCHEMAS = {
+    "competitors": model_schema(CompetitorAnalysis, competitors="competitors"),
+    "competitive_landscape": object_schema(
+        market_concentration={"type": "string"},
+        competition_intensity={"type": "string"},
+        entry_barriers={"type": "string"},
+        substitute_threat={"type": "string"},
+        competitive_strategies=STRING_LIST_SCHEMA
+    ),
+    "competitor_batch": object_schema(competitors={
+        "type": "array",
+        "items": object_schema(index={"type": "integer"}, name={"type": "string"},
+                               strengths=STRING_LIST_SCHEMA, weaknesses=STRING_LIST_SCHEMA)
+    }),
+    "product_comparison": model_schema(CompetitorAnalysis, product_comparison="product_comparison"),
+    "marketing_strategies": model_schema(CompetitorAnalysis, marketing_strategies="marketing_strategies"),
+    "competitive_advantages": model_schema(CompetitorAnalysis, competitive_advantages="competitive_advantages"),
+    "market_positioning": object_schema(
+        target_market={"type": "string"},
+        value_proposition={"type": "string"},
+        brand_image={"type": "string"},
+        differentiation={"type": "string"},
+        market_position={"type": "string"}
+    ),
+    "strengths": object_schema(strengths=STRING_LIST_SCHEMA),
+    "weaknesses": object_schema(weaknesses=STRING_LIST_SCHEMA),
+    "competitor_analysis": model_schema(CompetitorAnalysis)
+}
+
+class CompetitorAnalyzer(BaseAnalyzer):
     """竞争分析器"""
     
-    def __init__(self):
-        self.openai_client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
-        self.competitor_detection_keywords = [
-            "competitor", "alternative", "vs", "compare", "similar",
-            "competition", "rival", "opponent", "challenger"
-        ]
+    system_prompt = "你是一个专业的竞争分析师，擅长分析市场竞争环境、竞争对手和竞争策略。"
+    fallback_response = {
+        "competitors": [{"name": "主要竞争对手", "type": "直接竞争"}],
+        "competitive_landscape": {"market_concentration": "中等", "competition_intensity": "高"},
+        "product_comparison": [{"aspect": "功能", "comparison": "需要详细分析"}],
+        "marketing_strategies": [{"strategy": "品牌营销", "effectiveness": "需要评估"}],
+        "competitive_advantages": ["技术优势", "成本优势"],
+        "market_positioning": {"target_market": "需要分析", "value_proposition": "需要明确"}
+    }
+    requires = ("website_content", "industry_info")
     
-    async def analyze(self, url: str) -> CompetitorAnalysis:
+    async def analyze(self, url: str, context: Optional[AnalysisContext] = None) -> CompetitorAnalysis:
         """
         分析指定URL的竞争环境
         
         Args:
             url: 要分析的网址
+            context: 任务内共享的分析上下文，未提供时单独创建
             
         Returns:
             CompetitorAnalysis: 竞争分析结果
         """
+        context = context or AnalysisContext(url)
+        fallback = self.fallback_response
+        # 识别竞争对手后，后五个阶段互不依赖，并发执行
+        stages = [Stage(name, lambda name=name: context.get(name)) for name in self.requires] + [
+            Stage("competitors", self._identify_competitors, requires=("website_content", "industry_info")),
+            Stage("competitive_landscape", self._analyze_competitive_landscape,
+                  requires=("competitors", "industry_info"), default=fallback["competitive_landscape"]),
+            Stage("product_comparison", self._analyze_product_comparison,
+                  requires=("competitors", "website_content"), default=fallback["product_comparison"]),
+            Stage("marketing_strategies", self._analyze_marketing_strategies,
+                  requires=("competitors",), default=fallback["marketing_strategies"]),
+            Stage("competitive_advantages", self._analyze_competitive_advantages,
+                  requires=("website_content", "competitors"), default=fallback["competitive_advantages"]),
+            Stage("market_positioning", self._analyze_market_positioning,
+                  requires=("website_content", "competitors"), default=fallback["market_positioning"])
+        ]
+        
         try:
-            # 1. 提取网站内容和行业信息
-            website_content = await self._extract_website_content(url)
-            industry_info = await self._identify_industry(url, website_content)
-            
-            # 2. 识别竞争对手
-            competitors = await self._identify_competitors(website_content, industry_info)
-            
-            # 3. 分析竞争格局
-            competitive_landscape = await self._analyze_competitive_landscape(competitors, industry_info)
-            
-            # 4. 产品对比分析
-            product_comparison = await self._analyze_product_comparison(competitors, website_content)
-            
-            # 5. 营销策略分析
-            marketing_strategies = await self._analyze_marketing_strategies(competitors)
-            
-            # 6. 竞争优势分析
-            competitive_advantages = await self._analyze_competitive_advantages(website_content, competitors)
-            
-            # 7. 市场定位分析
-            market_positioning = await self._analyze_market_positioning(website_content, competitors)
+            results = await run_stages(stages, timeout=settings.ANALYSIS_STAGE_TIMEOUT)
             
             return CompetitorAnalysis(
-                competitors=competitors,
-                competitive_landscape=competitive_landscape,
-                product_comparison=product_comparison,
-                marketing_strategies=marketing_strategies,
-                competitive_advantages=competitive_advantages,
-                market_positioning=market_positioning
+                competitors=results["competitors"],
+                competitive_landscape=results["competitive_landscape"],
+                product_comparison=results["product_comparison"],
+                marketing_strategies=results["marketing_strategies"],
+                competitive_advantages=results["competitive_advantages"],
+                market_positioning=results["market_positioning"]
             )
             
         except Exception as e:
             # 返回基于网站内容的AI分析结果
             return await self._fallback_analysis(url)
     
-    async def _extract_website_content(self, url: str) -> Dict[str, Any]:
-        """提取网站内容"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=30.0)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 提取关键信息
-            title = soup.find('title').get_text() if soup.find('title') else ""
-            description = soup.find('meta', {'name': 'description'})
-            description = description.get('content', '') if description else ""
-            
-            # 提取主要内容
-            main_content = ""
-            for tag in soup.find_all(['h1', 'h2', 'h3', 'p', 'div']):
-                if tag.get_text().strip():
-                    main_content += tag.get_text().strip() + " "
-            
-            # 提取竞争对手相关关键词
-            competitor_keywords = self._extract_competitor_keywords(main_content)
-            
-            return {
-                "title": title,
-                "description": description,
-                "content": main_content[:5000],
-                "competitor_keywords": competitor_keywords,
-                "url": url
-            }
-    
-    def _extract_competitor_keywords(self, content: str) -> List[str]:
-        """提取竞争对手相关关键词"""
-        keywords = []
-        content_lower = content.lower()
-        for word in self.competitor_detection_keywords:
-            if word.lower() in content_lower:
-                keywords.append(word)
-        
-        return keywords
-    
-    async def _identify_industry(self, url: str, content: Dict[str, Any]) -> Dict[str, Any]:
-        """识别行业类别"""
-        prompt = f"""
-        基于以下网站信息，识别该网站所属的行业类别：
-        
-        URL: {url}
-        标题: {content['title']}
-        描述: {content['description']}
-        内容摘要: {content['content'][:1000]}
-        
-        请返回JSON格式的行业信息，包含：
-        - industry_name: 行业名称
-        - industry_category: 行业分类
-        - key_products: 主要产品/服务
-        - market_players: 主要市场参与者
-        """
-        
-        response = await self._call_openai(prompt)
-        return json.loads(response)
-    
     async def _identify_competitors(self, website_content: Dict[str, Any], industry_info: Dict[str, Any]) -> List[Dict[str, Any]]:
         """识别竞争对手"""
-        prompt = f"""
+        prompt = build_prompt("identify_competitors", """
         基于以下信息，识别主要竞争对手：
         
-        网站内容: {website_content['content'][:2000]}
-        行业信息: {json.dumps(industry_info, ensure_ascii=False)}
-        竞争对手关键词: {website_content['competitor_keywords']}
+        网站内容: {content}
+        行业信息: {industry_info}
+        竞争对手关键词: {keywords}
         
         请识别并分析主要竞争对手，包括：
         1. 直接竞争对手
@@ -139,29 +122,96 @@ class CompetitorAnalyzer:
         4. 每个竞争对手的基本信息
         
         请以JSON格式返回结果，包含competitors数组。
-        """
+        """, content=Excerpt(website_content['content'], 2000), industry_info=JsonContext(industry_info),
+            keywords=website_content['competitor_keywords'],
+            schema=OUTPUT_SCHEMAS["competitors"])
         
-        response = await self._call_openai(prompt)
-        analysis_data = json.loads(response)
+        analysis_data = await self._call_json(prompt, {
+            "competitors": self.fallback_response["competitors"]
+        })
         
         # 补充竞争对手数据
         competitors = analysis_data.get("competitors", [])
-        for competitor in competitors:
-            competitor.update({
-                "market_share": await self._estimate_market_share(competitor),
-                "strengths": await self._analyze_competitor_strengths(competitor),
-                "weaknesses": await self._analyze_competitor_weaknesses(competitor)
-            })
+        await self._enrich_competitors(competitors)
         
         return competitors
     
+    async def _enrich_competitors(self, competitors: List[Dict[str, Any]]):
+        """
+        补充竞争对手的市场份额、优势和劣势
+        
+        批量模式用一次请求分析所有竞争对手，批量结果缺失的竞争对手
+        再逐个并发分析。
+        """
+        for competitor in competitors:
+            competitor["market_share"] = await self._estimate_market_share(competitor)
+        
+        pending = competitors
+        if settings.COMPETITOR_ENRICHMENT_MODE == "batch" and len(competitors) > 1:
+            pending = await self._analyze_competitors_batch(competitors)
+        
+        await asyncio.gather(*(self._analyze_competitor(competitor) for competitor in pending))
+    
+    async def _analyze_competitors_batch(self, competitors: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """一次请求分析所有竞争对手的优势和劣势，返回结果缺失的竞争对手"""
+        listing = JsonContext(
+            [dict(competitor, index=index) for index, competitor in enumerate(competitors)],
+            COMPETITOR_FIELDS["profile"] + ("index",)
+        )
+        prompt = build_prompt("competitor_batch", """
+        分析以下每个竞争对手的优势和劣势：
+        
+        {listing}
+        
+        请以JSON格式返回结果，包含competitors数组，每项包含：
+        - index: 竞争对手序号
+        - name: 竞争对手名称
+        - strengths: 主要优势数组
+        - weaknesses: 主要劣势数组
+        """, listing=listing,
+            schema=OUTPUT_SCHEMAS["competitor_batch"])
+        
+        try:
+            items = (await self._call_json(prompt, {})).get("competitors", [])
+        except AttributeError:
+            return competitors
+        
+        by_index = {}
+        by_name = {}
+        for item in items:
+            if not isinstance(item, dict) or "strengths" not in item or "weaknesses" not in item:
+                continue
+            if isinstance(item.get("index"), int):
+                by_index[item["index"]] = item
+            if item.get("name"):
+                by_name[str(item["name"]).lower()] = item
+        
+        pending = []
+        for index, competitor in enumerate(competitors):
+            item = by_index.get(index) or by_name.get(str(competitor.get("name", "")).lower())
+            if item is None:
+                pending.append(competitor)
+            else:
+                competitor["strengths"] = item["strengths"]
+                competitor["weaknesses"] = item["weaknesses"]
+        return pending
+    
+    async def _analyze_competitor(self, competitor: Dict[str, Any]):
+        """单独分析一个竞争对手，优势和劣势并发请求"""
+        strengths, weaknesses = await asyncio.gather(
+            self._analyze_competitor_strengths(competitor),
+            self._analyze_competitor_weaknesses(competitor)
+        )
+        competitor["strengths"] = strengths
+        competitor["weaknesses"] = weaknesses
+    
     async def _analyze_competitive_landscape(self, competitors: List[Dict[str, Any]], industry_info: Dict[str, Any]) -> Dict[str, Any]:
         """分析竞争格局"""
-        prompt = f"""
+        prompt = build_prompt("competitive_landscape", """
         基于以下竞争对手信息，分析竞争格局：
         
-        竞争对手: {json.dumps(competitors, ensure_ascii=False)}
-        行业信息: {json.dumps(industry_info, ensure_ascii=False)}
+        竞争对手: {competitors}
+        行业信息: {industry_info}
         
         请分析竞争格局，包括：
         1. 市场集中度
@@ -171,18 +221,19 @@ class CompetitorAnalyzer:
         5. 竞争策略类型
         
         请以JSON格式返回结果。
-        """
+        """, competitors=JsonContext(competitors, COMPETITOR_FIELDS["competitive_landscape"]),
+            industry_info=JsonContext(industry_info),
+            schema=OUTPUT_SCHEMAS["competitive_landscape"])
         
-        response = await self._call_openai(prompt)
-        return json.loads(response)
+        return await self._call_json(prompt, self.fallback_response["competitive_landscape"])
     
     async def _analyze_product_comparison(self, competitors: List[Dict[str, Any]], website_content: Dict[str, Any]) -> List[Dict[str, Any]]:
         """产品对比分析"""
-        prompt = f"""
+        prompt = build_prompt("product_comparison", """
         基于以下信息，进行产品对比分析：
         
-        竞争对手: {json.dumps(competitors, ensure_ascii=False)}
-        网站内容: {website_content['content'][:1500]}
+        竞争对手: {competitors}
+        网站内容: {content}
         
         请对比分析产品/服务，包括：
         1. 功能特性对比
@@ -192,19 +243,22 @@ class CompetitorAnalyzer:
         5. 服务支持对比
         
         请以JSON格式返回结果，包含product_comparison数组。
-        """
+        """, competitors=JsonContext(competitors, COMPETITOR_FIELDS["product_comparison"]),
+            content=Excerpt(website_content['content'], 1500),
+            schema=OUTPUT_SCHEMAS["product_comparison"])
         
-        response = await self._call_openai(prompt)
-        analysis_data = json.loads(response)
+        analysis_data = await self._call_json(prompt, {
+            "product_comparison": self.fallback_response["product_comparison"]
+        })
         
         return analysis_data.get("product_comparison", [])
     
     async def _analyze_marketing_strategies(self, competitors: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """营销策略分析"""
-        prompt = f"""
+        prompt = build_prompt("marketing_strategies", """
         基于以下竞争对手信息，分析营销策略：
         
-        竞争对手: {json.dumps(competitors, ensure_ascii=False)}
+        竞争对手: {competitors}
         
         请分析营销策略，包括：
         1. 品牌定位策略
@@ -214,20 +268,22 @@ class CompetitorAnalyzer:
         5. 客户获取策略
         
         请以JSON格式返回结果，包含marketing_strategies数组。
-        """
+        """, competitors=JsonContext(competitors, COMPETITOR_FIELDS["marketing_strategies"]),
+            schema=OUTPUT_SCHEMAS["marketing_strategies"])
         
-        response = await self._call_openai(prompt)
-        analysis_data = json.loads(response)
+        analysis_data = await self._call_json(prompt, {
+            "marketing_strategies": self.fallback_response["marketing_strategies"]
+        })
         
         return analysis_data.get("marketing_strategies", [])
     
     async def _analyze_competitive_advantages(self, website_content: Dict[str, Any], competitors: List[Dict[str, Any]]) -> List[str]:
         """竞争优势分析"""
-        prompt = f"""
+        prompt = build_prompt("competitive_advantages", """
         基于以下信息，分析竞争优势：
         
-        网站内容: {website_content['content'][:2000]}
-        竞争对手: {json.dumps(competitors, ensure_ascii=False)}
+        网站内容: {content}
+        竞争对手: {competitors}
         
         请识别和分析竞争优势，包括：
         1. 技术优势
@@ -237,20 +293,23 @@ class CompetitorAnalyzer:
         5. 品牌优势
         
         请以JSON格式返回结果，包含competitive_advantages数组。
-        """
+        """, content=Excerpt(website_content['content'], 2000),
+            competitors=JsonContext(competitors, COMPETITOR_FIELDS["competitive_advantages"]),
+            schema=OUTPUT_SCHEMAS["competitive_advantages"])
         
-        response = await self._call_openai(prompt)
-        analysis_data = json.loads(response)
+        analysis_data = await self._call_json(prompt, {
+            "competitive_advantages": self.fallback_response["competitive_advantages"]
+        })
         
         return analysis_data.get("competitive_advantages", [])
     
     async def _analyze_market_positioning(self, website_content: Dict[str, Any], competitors: List[Dict[str, Any]]) -> Dict[str, Any]:
         """市场定位分析"""
-        prompt = f"""
+        prompt = build_prompt("market_positioning", """
         基于以下信息，分析市场定位：
         
-        网站内容: {website_content['content'][:2000]}
-        竞争对手: {json.dumps(competitors, ensure_ascii=False)}
+        网站内容: {content}
+        竞争对手: {competitors}
         
         请分析市场定位，包括：
         1. 目标市场定位
@@ -260,10 +319,11 @@ class CompetitorAnalyzer:
         5. 市场地位评估
         
         请以JSON格式返回结果。
-        """
+        """, content=Excerpt(website_content['content'], 2000),
+            competitors=JsonContext(competitors, COMPETITOR_FIELDS["market_positioning"]),
+            schema=OUTPUT_SCHEMAS["market_positioning"])
         
-        response = await self._call_openai(prompt)
-        return json.loads(response)
+        return await self._call_json(prompt, self.fallback_response["market_positioning"])
     
     async def _estimate_market_share(self, competitor: Dict[str, Any]) -> str:
         """估算市场份额"""
@@ -272,33 +332,33 @@ class CompetitorAnalyzer:
     
     async def _analyze_competitor_strengths(self, competitor: Dict[str, Any]) -> List[str]:
         """分析竞争对手优势"""
-        prompt = f"""
-        分析竞争对手 {competitor.get('name', 'Unknown')} 的优势：
+        prompt = build_prompt("competitor_strengths", """
+        分析竞争对手 {name} 的优势：
         
-        竞争对手信息: {json.dumps(competitor, ensure_ascii=False)}
+        竞争对手信息: {competitor}
         
         请识别该竞争对手的主要优势。
         请以JSON格式返回结果，包含strengths数组。
-        """
+        """, name=competitor.get('name', 'Unknown'), competitor=JsonContext(competitor, COMPETITOR_FIELDS["profile"]),
+            schema=OUTPUT_SCHEMAS["strengths"])
         
-        response = await self._call_openai(prompt)
-        analysis_data = json.loads(response)
+        analysis_data = await self._call_json(prompt, {"strengths": []})
         
         return analysis_data.get("strengths", [])
     
     async def _analyze_competitor_weaknesses(self, competitor: Dict[str, Any]) -> List[str]:
         """分析竞争对手劣势"""
-        prompt = f"""
-        分析竞争对手 {competitor.get('name', 'Unknown')} 的劣势：
+        prompt = build_prompt("competitor_weaknesses", """
+        分析竞争对手 {name} 的劣势：
         
-        竞争对手信息: {json.dumps(competitor, ensure_ascii=False)}
+        竞争对手信息: {competitor}
         
         请识别该竞争对手的主要劣势。
         请以JSON格式返回结果，包含weaknesses数组。
-        """
+        """, name=competitor.get('name', 'Unknown'), competitor=JsonContext(competitor, COMPETITOR_FIELDS["profile"]),
+            schema=OUTPUT_SCHEMAS["weaknesses"])
         
-        response = await self._call_openai(prompt)
-        analysis_data = json.loads(response)
+        analysis_data = await self._call_json(prompt, {"weaknesses": []})
         
         return analysis_data.get("weaknesses", [])
     
@@ -310,8 +370,7 @@ class CompetitorAnalyzer:
         以JSON格式返回。
         """
         
-        response = await self._call_openai(prompt)
-        analysis_data = json.loads(response)
+        analysis_data = await self._call_json(with_schema(prompt, OUTPUT_SCHEMAS["competitor_analysis"]), self.fallback_response)
         
         return CompetitorAnalysis(
             competitors=analysis_data.get("competitors", []),
@@ -321,27 +380,3 @@ class CompetitorAnalyzer:
             competitive_advantages=analysis_data.get("competitive_advantages", []),
             market_positioning=analysis_data.get("market_positioning", {})
         )
-    
-    async def _call_openai(self, prompt: str) -> str:
-        """调用OpenAI API"""
-        try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "你是一个专业的竞争分析师，擅长分析市场竞争环境、竞争对手和竞争策略。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=2000
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            # 返回默认分析结果
-            return json.dumps({
-                "competitors": [{"name": "主要竞争对手", "type": "直接竞争"}],
-                "competitive_landscape": {"market_concentration": "中等", "competition_intensity": "高"},
-                "product_comparison": [{"aspect": "功能", "comparison": "需要详细分析"}],
-                "marketing_strategies": [{"strategy": "品牌营销", "effectiveness": "需要评估"}],
-                "competitive_advantages": ["技术优势", "成本优势"],
-                "market_positioning": {"target_market": "需要分析", "value_proposition": "需要明确"}
-            }) 
\ No newline at end of file
@@ -0,0 +1,106 @@
+import asyncio
+from typing import Dict, Any, List, Optional
+from app.core.config import settings
+from app.services.page_fetcher import fetch_page
+from app.services.text_extractor import TextExtractor
+from app.services.site_crawler import SiteCrawler
+from app.services.keyword_matcher import get_keyword_matcher
+
+# 用户相关关键词
+USER_KEYWORDS = [
+    "用户", "客户", "消费者", "用户群体", "目标用户", "用户需求",
+    "user", "customer", "consumer", "audience", "target", "need",
+    "pain point", "problem", "solution", "benefit", "value"
+]
+
+# 竞争对手相关关键词
+COMPETITOR_KEYWORDS = [
+    "competitor", "alternative", "vs", "compare", "similar",
+    "competition", "rival", "opponent", "challenger"
+]
+
+
+def extract_keywords(content: str, vocabulary: List[str]) -> List[str]:
+    """提取内容中出现的关键词，词表只编译一次"""
+    return get_keyword_matcher(tuple(vocabulary)).present(content)
+
+
+def build_page(extracted: Dict[str, Any], url: str) -> Dict[str, Any]:
+    """由提取结果生成页面数据，包含标题、描述、正文和关键词集合"""
+    main_content = extracted["text"]
+
+    return {
+        "title": extracted["title"],
+        "description": extracted["description"],
+        "content": main_content[:5000],  # 限制内容长度
+        "keywords": {
+            "user": extract_keywords(main_content, USER_KEYWORDS),
+            "competitor": extract_keywords(main_content, COMPETITOR_KEYWORDS)
+        },
+        "links": extracted["links"],
+        "url": url
+    }
+
+
+class ContentStore:
+    """单个分析任务的网页内容存储
+
+    同一任务内每个URL只抓取和解析一次，结果由所有分析器共享。
+    启用 crawl 时，get_bundle() 额外抓取站内重要页面并合并内容。
+    pages 传入其他进程已抓取的页面（见 export_pages()，如提交任务时的准入检查）。
+    """
+
+    def __init__(self, crawl: bool = False, pages: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.crawl = crawl
+        self._pages: Dict[str, Dict[str, Any]] = {}
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._bundles: Dict[str, asyncio.Task] = {}
+        self.status_codes: Dict[str, int] = {}
+        self.num_bytes: Dict[str, int] = {}
+        for url, item in (pages or {}).items():
+            self._pages[url] = item["page"]
+            self.status_codes[url] = 200
+            self.num_bytes[url] = item["num_bytes"]
+
+    def export_pages(self) -> Dict[str, Dict[str, Any]]:
+        """导出已成功抓取的页面，可交给其他进程的 ContentStore 复用"""
+        return {url: {"page": page, "num_bytes": self.num_bytes.get(url, 0)}
+                for url, page in self._pages.items() if self.status_codes.get(url) == 200}
+
+    async def get(self, url: str, timeout: float = 30.0) -> Dict[str, Any]:
+        """获取URL的解析结果，首次访问时抓取并解析，并发访问共享同一次抓取"""
+        if url in self._pages:
+            return self._pages[url]
+
+        task = self._pending.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_and_parse(url, timeout))
+            self._pending[url] = task
+        try:
+            page = await asyncio.shield(task)
+        finally:
+            # 失败的抓取不缓存，允许后续重试
+            if task.done() and self._pending.get(url) is task:
+                del self._pending[url]
+
+        self._pages[url] = page
+        return page
+
+    async def get_bundle(self, url: str) -> Dict[str, Any]:
+        """获取分析用的内容包：未启用站内抓取时即单个页面"""
+        if not self.crawl:
+            return await self.get(url)
+
+        task = self._bundles.get(url)
+        if task is None or (task.done() and task.exception() is not None):
+            task = asyncio.ensure_future(SiteCrawler(self).crawl(url))
+            self._bundles[url] = task
+        return await asyncio.shield(task)
+
+    async def _fetch_and_parse(self, url: str, timeout: float) -> Dict[str, Any]:
+        """边下载边解析网页，正文足够后停止下载"""
+        extractor = TextExtractor(settings.MAX_CONTENT_LENGTH)
+        fetched = await fetch_page(url, timeout=timeout, feed=extractor.feed)
+        self.status_codes[url] = fetched.status_code
+        self.num_bytes[url] = fetched.num_bytes
+        return build_page(extractor.close(), url)
@@ -0,0 +1,148 @@
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+from urllib.parse import urlparse
+from app.core.config import settings
+
+
+class _HostState:
+    """单个主机的调度状态"""
+
+    def __init__(self):
+        self.active = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.next_allowed = 0.0  # 下一次允许发起请求的时间（事件循环时钟）
+
+
+class FetchScheduler:
+    """
+    出站请求调度器
+
+    - 全局并发上限，避免耗尽连接池
+    - 每个主机的并发上限和最小请求间隔，避免被目标站点限流
+    - 有排队请求的主机之间轮转出队，单个主机的大批请求不会饿死其他主机
+    """
+
+    def __init__(self, max_concurrency: int, per_host_concurrency: int, min_interval: float):
+        self.max_concurrency = max_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.min_interval = min_interval
+        self._reset(None)
+
+    def _reset(self, loop: Optional[asyncio.AbstractEventLoop]):
+        self._loop = loop
+        self._hosts: Dict[str, _HostState] = {}
+        self._ready: "OrderedDict[str, None]" = OrderedDict()  # 有排队请求的主机，按轮转顺序
+        self._active = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """占用一个请求名额，退出时释放"""
+        host = (urlparse(url).hostname or "").lower()
+        await self._acquire(host)
+        try:
+            yield
+        finally:
+            self._release(host)
+
+    async def _acquire(self, host: str):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # 事件循环变化（如 Worker 中每个任务独立运行）时，旧状态已无效
+            self._reset(loop)
+
+        state = self._hosts.setdefault(host, _HostState())
+        waiter = loop.create_future()
+        state.waiters.append(waiter)
+        self._ready[host] = None
+        self._dispatch()
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 已分配名额但调用方被取消，归还名额
+                self._release(host)
+            else:
+                try:
+                    state.waiters.remove(waiter)
+                except ValueError:
+                    pass
+            raise
+
+    def _release(self, host: str):
+        state = self._hosts[host]
+        state.active -= 1
+        self._active -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """按主机轮转分配空闲名额，受间隔限制的主机到期后再调度"""
+        now = self._loop.time()
+        earliest = None
+
+        progressed = True
+        while progressed and self._active < self.max_concurrency and self._ready:
+            progressed = False
+            for host in list(self._ready):
+                if self._active >= self.max_concurrency:
+                    break
+                state = self._hosts[host]
+                while state.waiters and state.waiters[0].done():
+                    state.waiters.popleft()
+                if not state.waiters:
+                    del self._ready[host]
+                    continue
+                if state.active >= self.per_host_concurrency:
+                    continue
+                if state.next_allowed > now:
+                    earliest = state.next_allowed if earliest is None else min(earliest, state.next_allowed)
+                    continue
+
+                state.waiters.popleft().set_result(None)
+                state.active += 1
+                self._active += 1
+                state.next_allowed = now + self.min_interval
+                self._ready.move_to_end(host)
+                progressed = True
+
+        self._prune(now)
+        if earliest is not None:
+            self._schedule(earliest)
+
+    def _schedule(self, when: float):
+        """在最早可发请求的时间点重新调度"""
+        if self._timer is not None:
+            if self._timer.when() <= when:
+                return
+            self._timer.cancel()
+        self._timer = self._loop.call_at(when, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    def _prune(self, now: float):
+        """清理空闲主机的状态"""
+        if len(self._hosts) <= self.max_concurrency * 4:
+            return
+        for host in [h for h, s in self._hosts.items()
+                     if not s.active and not s.waiters and s.next_allowed <= now]:
+            del self._hosts[host]
+
+
+_fetch_scheduler: Optional[FetchScheduler] = None
+
+
+def get_fetch_scheduler() -> FetchScheduler:
+    """获取进程内共享的出站请求调度器"""
+    global _fetch_scheduler
+    if _fetch_scheduler is None:
+        _fetch_scheduler = FetchScheduler(
+            settings.FETCH_MAX_CONCURRENCY,
+            settings.FETCH_PER_HOST_CONCURRENCY,
+            settings.FETCH_HOST_MIN_INTERVAL
+        )
+    return _fetch_scheduler
@@ -0,0 +1,55 @@
+import re
+import hashlib
+from typing import Dict, Any, List
+
+# 英文单词、数字按词切分，中文按字切分
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]")
+
+SIMHASH_BITS = 64
+
+
+def normalize_content(text: str) -> str:
+    """规范化正文：小写并合并空白，忽略排版差异"""
+    return " ".join(text.lower().split())
+
+
+def _shingles(text: str, size: int = 3) -> List[str]:
+    """相邻词组成的片段，作为 SimHash 特征"""
+    tokens = TOKEN_PATTERN.findall(text)
+    if len(tokens) <= size:
+        return [" ".join(tokens)] if tokens else []
+    return [" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+
+
+def simhash(text: str) -> int:
+    """计算 64 位 SimHash，内容越相近汉明距离越小"""
+    weights = [0] * SIMHASH_BITS
+    for shingle in _shingles(text):
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+
+    result = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            result |= 1 << bit
+    return result
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """两个 SimHash 的汉明距离"""
+    return bin(a ^ b).count("1")
+
+
+def compute_fingerprint(page: Dict[str, Any]) -> Dict[str, str]:
+    """
+    计算网页内容指纹
+
+    Returns:
+        Dict: content_hash 为规范化正文的 SHA-256，simhash 为 16 位十六进制字符串
+    """
+    text = normalize_content(" ".join([page.get("title", ""), page.get("description", ""), page.get("content", "")]))
+    return {
+        "content_hash": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+        "simhash": format(simhash(text), "016x")
+    }
@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import aiofiles
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Set
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，只在进程内加锁
+    fcntl = None
+
+
+class HTTPCache:
+    """
+    网页响应的磁盘缓存
+
+    响应体按内容哈希存储（相同内容只存一份），索引记录 URL 对应的
+    ETag / Last-Modified，过期后通过条件请求重新验证。总大小超出上限时
+    按最近最少使用顺序淘汰。
+
+    同一缓存目录可由多个进程共用（API 与 Celery Worker）：修改索引时持有文件锁，
+    先重新读取索引文件再合并本进程的修改，不会覆盖其他进程写入的条目。
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, ttl: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._index_path = os.path.join(cache_dir, "index.json")
+        self._lock_path = os.path.join(cache_dir, "index.lock")
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._index_mtime: Optional[float] = None
+        # 尚未写入索引文件的访问时间和删除
+        self._touched: Dict[str, float] = {}
+        self._removed: Set[str] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        os.makedirs(os.path.join(cache_dir, "objects"), exist_ok=True)
+        self._refresh()
+
+    def _get_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # 事件循环变化（如 Worker 中每个任务独立运行）时重建锁
+            self._loop = loop
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    @contextmanager
+    def _file_lock(self):
+        """跨进程的索引文件锁"""
+        with open(self._lock_path, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        """读取索引文件，文件不存在或损坏时返回空索引"""
+        try:
+            self._index_mtime = os.stat(self._index_path).st_mtime
+            with open(self._index_path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _merge(self, entries: Dict[str, Dict[str, Any]]):
+        """以索引文件为准，叠加本进程尚未写入的访问时间和删除，按访问时间排序"""
+        for url in self._removed:
+            entries.pop(url, None)
+        for url, accessed_at in self._touched.items():
+            entry = entries.get(url)
+            if entry is not None:
+                entry["accessed_at"] = max(entry.get("accessed_at", 0), accessed_at)
+        self._entries = OrderedDict(sorted(entries.items(), key=lambda item: item[1].get("accessed_at", 0)))
+
+    def _refresh(self):
+        """索引文件被其他进程更新后重新读取"""
+        try:
+            mtime = os.stat(self._index_path).st_mtime
+        except OSError:
+            return
+        if mtime != self._index_mtime:
+            self._merge(self._read_index())
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, "objects", digest[:2], digest[2:])
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """查找URL的缓存条目"""
+        self._refresh()
+        return self._entries.get(url)
+
+    def discard(self, url: str):
+        """删除URL的缓存条目"""
+        self._entries.pop(url, None)
+        self._touched.pop(url, None)
+        self._removed.add(url)
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        """缓存条目是否仍在 TTL 内"""
+        return time.time() - entry["stored_at"] < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry: Dict[str, Any]) -> Dict[str, str]:
+        """生成条件请求头"""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    async def read_body(self, url: str, entry: Dict[str, Any]) -> Optional[str]:
+        """读取缓存的响应体，文件已被淘汰时返回 None"""
+        try:
+            async with aiofiles.open(self._object_path(entry["digest"]), "r", encoding="utf-8") as f:
+                body = await f.read()
+        except OSError:
+            self.discard(url)
+            return None
+
+        entry["accessed_at"] = time.time()
+        self._touched[url] = entry["accessed_at"]
+        if url in self._entries:
+            self._entries.move_to_end(url)
+        return body
+
+    async def revalidated(self, url: str, entry: Dict[str, Any], headers: Dict[str, str]):
+        """服务器返回 304，刷新条目的有效期"""
+        updates = {
+            "stored_at": time.time(),
+            "etag": headers.get("etag") or entry.get("etag"),
+            "last_modified": headers.get("last-modified") or entry.get("last_modified")
+        }
+        entry.update(updates)
+
+        def update(entries: Dict[str, Dict[str, Any]]):
+            # 条目已被其他进程淘汰时不恢复，下次抓取重新下载
+            if url in entries and entries[url]["digest"] == entry["digest"]:
+                entries[url].update(updates)
+
+        await self._update_index(update)
+
+    async def store(self, url: str, body: str, headers: Dict[str, str], truncated: bool = False):
+        """写入响应体，服务器禁止缓存时跳过"""
+        if "no-store" in headers.get("cache-control", ""):
+            return
+
+        data = body.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 临时文件名区分进程，避免多个进程同时写入同一对象
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            async with aiofiles.open(tmp_path, "wb") as f:
+                await f.write(data)
+            os.replace(tmp_path, path)
+
+        now = time.time()
+        new_entry = {
+            "digest": digest,
+            "size": len(data),
+            "etag": headers.get("etag"),
+            "last_modified": headers.get("last-modified"),
+            "truncated": truncated,
+            "stored_at": now,
+            "accessed_at": now
+        }
+
+        def update(entries: Dict[str, Dict[str, Any]]):
+            entries.pop(url, None)
+            entries[url] = new_entry
+
+        self._removed.discard(url)
+        await self._update_index(update)
+
+    async def _update_index(self, update):
+        """持有文件锁读取最新索引，合并本进程的修改、淘汰并写回；文件操作在线程中执行"""
+        async with self._get_lock():
+            touched, self._touched = self._touched, {}
+            removed, self._removed = self._removed, set()
+
+            def run():
+                with self._file_lock():
+                    entries = self._read_index()
+                    for url in removed:
+                        entries.pop(url, None)
+                    for url, accessed_at in touched.items():
+                        if url in entries:
+                            entries[url]["accessed_at"] = max(entries[url].get("accessed_at", 0), accessed_at)
+                    update(entries)
+                    entries = OrderedDict(sorted(entries.items(), key=lambda item: item[1].get("accessed_at", 0)))
+                    self._evict(entries)
+                    self._write_index(entries)
+                    return entries
+
+            entries = await asyncio.to_thread(run)
+            self._merge(entries)
+
+    def _evict(self, entries: "OrderedDict[str, Dict[str, Any]]"):
+        """超出容量时按 LRU 顺序淘汰，无条目引用的对象文件一并删除"""
+        references = Counter(entry["digest"] for entry in entries.values())
+        sizes = {entry["digest"]: entry["size"] for entry in entries.values()}
+        total = sum(sizes.values())
+
+        for url in list(entries):
+            if total <= self.max_bytes or len(entries) <= 1:
+                break
+            digest = entries.pop(url)["digest"]
+            references[digest] -= 1
+            if references[digest] > 0:
+                continue
+            total -= sizes[digest]
+            try:
+                os.remove(self._object_path(digest))
+            except OSError:
+                pass
+
+    def _write_index(self, entries: Dict[str, Dict[str, Any]]):
+        """原子写入索引文件"""
+        tmp_path = f"{self._index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self._index_path)
+        self._index_mtime = os.stat(self._index_path).st_mtime
+
+
+_http_cache: Optional[HTTPCache] = None
+
+
+def get_http_cache() -> Optional[HTTPCache]:
+    """获取进程内共享的网页缓存，未启用时返回 None"""
+    global _http_cache
+    if not settings.HTTP_CACHE_ENABLED:
+        return None
+    if _http_cache is None:
+        _http_cache = HTTPCache(settings.HTTP_CACHE_DIR, settings.HTTP_CACHE_MAX_BYTES, settings.CACHE_TTL)
+    return _http_cache
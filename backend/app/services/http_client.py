@@ -0,0 +1,50 @@
+import httpx
+import importlib.util
+from typing import Optional
+from app.core.config import settings
+
+# 进程内共享的HTTP客户端
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    """HTTP/2 依赖 h2 包，未安装时退回 HTTP/1.1"""
+    return importlib.util.find_spec("h2") is not None
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """按配置创建带连接池的HTTP客户端"""
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+    )
+    return httpx.AsyncClient(
+        limits=limits,
+        http2=settings.HTTP_ENABLE_HTTP2 and _http2_available(),
+        timeout=settings.HTTP_TIMEOUT
+    )
+
+
+async def start_http_client() -> httpx.AsyncClient:
+    """应用启动时创建共享客户端"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = create_http_client()
+    return _http_client
+
+
+async def close_http_client():
+    """应用关闭时释放连接池"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """获取共享客户端，未经应用启动流程时（如脚本、Worker）按需创建"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = create_http_client()
+    return _http_client
@@ -0,0 +1,111 @@
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+
+@dataclass
+class KeywordMatch:
+    """关键词匹配结果"""
+    keyword: str
+    start: int
+    end: int
+
+
+def _is_word_char(ch: str) -> bool:
+    """英文单词字符，用于判断词边界；中文词不要求边界"""
+    return ch.isascii() and ch.isalnum()
+
+
+class KeywordMatcher:
+    """
+    多模式关键词匹配器
+
+    词表预先编译为 Aho-Corasick 自动机，一次扫描找出所有关键词（含重叠匹配），
+    耗时与正文长度和匹配数成正比，与词表大小无关。英文关键词按词边界匹配，
+    允许复数后缀 s/es（"customer" 匹配 "customers"，"vs" 不匹配 "canvas"）。
+    """
+
+    def __init__(self, vocabulary: Iterable[str]):
+        self.vocabulary = list(dict.fromkeys(vocabulary))
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        for index, keyword in enumerate(self.vocabulary):
+            self._insert(keyword.lower(), index)
+        self._build_failure_links()
+
+    def _insert(self, term: str, index: int):
+        state = 0
+        for ch in term:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(index)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(ch, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def _match_end(self, text: str, start: int, end: int) -> int:
+        """检查词边界，返回匹配的结束位置（含复数后缀），不满足边界时返回 -1"""
+        keyword_text = text[start:end]
+        if _is_word_char(keyword_text[0]) and start > 0 and _is_word_char(text[start - 1]):
+            return -1
+        if not _is_word_char(keyword_text[-1]):
+            return end
+        for suffix in ("", "s", "es"):
+            tail = end + len(suffix)
+            if text.startswith(suffix, end) and (tail >= len(text) or not _is_word_char(text[tail])):
+                return tail
+        return -1
+
+    def find_all(self, text: str) -> List[KeywordMatch]:
+        """找出所有关键词出现的位置，按起始位置排序"""
+        lowered = text.lower()
+        goto, fail, output = self._goto, self._fail, self._output
+        matches = []
+        state = 0
+        for position, ch in enumerate(lowered):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index in output[state]:
+                keyword = self.vocabulary[index]
+                start = position + 1 - len(keyword)
+                end = self._match_end(lowered, start, position + 1)
+                if end >= 0:
+                    matches.append(KeywordMatch(keyword, start, end))
+        matches.sort(key=lambda match: match.start)
+        return matches
+
+    def count(self, text: str) -> Dict[str, int]:
+        """统计每个关键词的出现次数"""
+        counts: Dict[str, int] = {}
+        for match in self.find_all(text):
+            counts[match.keyword] = counts.get(match.keyword, 0) + 1
+        return counts
+
+    def present(self, text: str) -> List[str]:
+        """返回出现过的关键词，保持词表顺序"""
+        counts = self.count(text)
+        return [keyword for keyword in self.vocabulary if keyword in counts]
+
+
+@lru_cache(maxsize=32)
+def get_keyword_matcher(vocabulary: Tuple[str, ...]) -> KeywordMatcher:
+    """按词表缓存编译好的匹配器"""
+    return KeywordMatcher(vocabulary)
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+from app.services.redis_client import get_redis, mark_redis_failed
+
+# 当前任务是否跳过缓存读取（仍会写入最新结果），由分析任务按请求设置
+llm_cache_bypass: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+REDIS_KEY_PREFIX = "llm:"
+
+
+def cache_key(model: str, system_prompt: str, prompt: str, temperature: float) -> str:
+    """按模型、提示词和温度计算缓存键"""
+    payload = json.dumps([model, system_prompt, prompt, temperature], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    LLM响应缓存
+
+    两级缓存：进程内 LRU 和可选的 Redis（多个进程、Worker 共享）。
+    条目在 ttl 秒后过期；Redis 不可用时只使用进程内缓存。
+    """
+
+    def __init__(self, max_entries: int, ttl: int, use_redis: bool = False):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.use_redis = use_redis
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.redis_hits = 0
+
+    def stats(self) -> Dict[str, int]:
+        """命中统计"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "redis_hits": self.redis_hits,
+            "entries": len(self._entries)
+        }
+
+    async def get(self, key: str) -> Optional[str]:
+        """读取缓存，未命中返回 None"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+
+        redis = get_redis() if self.use_redis else None
+        if redis is not None:
+            try:
+                value = await redis.get(REDIS_KEY_PREFIX + key)
+            except Exception:
+                value = None
+                mark_redis_failed()
+            if value is not None:
+                value = value.decode("utf-8")
+                self._remember(key, value)
+                self.hits += 1
+                self.redis_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str):
+        """写入缓存"""
+        self._remember(key, value)
+        redis = get_redis() if self.use_redis else None
+        if redis is not None:
+            try:
+                await redis.set(REDIS_KEY_PREFIX + key, value, ex=self.ttl)
+            except Exception:
+                mark_redis_failed()
+
+    def _remember(self, key: str, value: str):
+        self._entries[key] = (time.time() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+_llm_cache: Optional[LLMCache] = None
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """获取进程内共享的LLM响应缓存，未启用时返回 None"""
+    global _llm_cache
+    if _llm_cache is None and settings.LLM_CACHE_ENABLED:
+        _llm_cache = LLMCache(
+            settings.LLM_CACHE_MAX_ENTRIES,
+            settings.CACHE_TTL,
+            settings.LLM_CACHE_REDIS_ENABLED
+        )
+    return _llm_cache
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Optional
+import openai
+from app.core.config import settings
+from app.services.llm_cache import get_llm_cache, cache_key, llm_cache_bypass
+
+logger = logging.getLogger(__name__)
+
+
+class LLMGateway:
+    """
+    异步LLM调用网关
+
+    所有分析器共享一个 AsyncOpenAI 客户端，调用不阻塞事件循环。
+    全局并发上限避免突发任务打满接口配额，单次调用有超时，调用方被取消时
+    请求随之取消。相同的模型、提示词和温度优先读取响应缓存。
+    """
+
+    def __init__(self, max_concurrency: int, timeout: float):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._reset(None)
+
+    def _reset(self, loop: Optional[asyncio.AbstractEventLoop]):
+        self._loop = loop
+        self._client: Optional[openai.AsyncOpenAI] = None
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def _get_client(self) -> openai.AsyncOpenAI:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # 事件循环变化（如 Worker 中每个任务独立运行）时，连接池和信号量都需重建
+            self._discard_client()
+            self._reset(loop)
+        if self._client is None:
+            self._client = openai.AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                timeout=self.timeout,
+                max_retries=settings.LLM_MAX_RETRIES
+            )
+        return self._client
+
+    def _discard_client(self):
+        """
+        释放上一个事件循环的客户端
+
+        连接池只能在创建它的事件循环中关闭：该循环仍在运行时交给它关闭；
+        已结束时无法再关闭，应在循环结束前调用 close_llm_gateway()（如 Celery 任务的 _run）。
+        """
+        if self._client is None:
+            return
+        if self._loop is not None and self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._client.close(), self._loop)
+        else:
+            logger.warning("LLM client was not closed before its event loop ended, its connections leak")
+
+    async def complete(self, prompt: str, system_prompt: str, model: Optional[str] = None,
+                       temperature: float = 0.3, max_tokens: Optional[int] = None,
+                       timeout: Optional[float] = None,
+                       validate: Optional[Callable[[str], Any]] = None,
+                       json_mode: bool = False) -> str:
+        """
+        发送一次对话补全请求
+
+        Args:
+            prompt: 用户提示词
+            system_prompt: 系统提示词
+            model: 模型名称，默认使用 LLM_MODEL
+            temperature: 采样温度
+            max_tokens: 最大输出token数，默认使用 LLM_MAX_TOKENS
+            timeout: 本次调用超时（秒），从获得并发名额开始计算，不含排队时间，默认使用 LLM_TIMEOUT
+            validate: 校验输出，抛出异常时该输出不写入缓存，缓存中未通过校验的输出视为未命中
+            json_mode: 要求模型只输出JSON对象（需要模型支持）
+
+        Returns:
+            str: 模型返回的文本
+        """
+        model = model or settings.LLM_MODEL
+        cache = get_llm_cache()
+        key = cache_key(model, system_prompt, prompt, temperature) if cache else None
+        if cache and not llm_cache_bypass.get():
+            cached = await cache.get(key)
+            if cached is not None and self._is_valid(cached, validate):
+                return cached
+
+        client = self._get_client()
+        request = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": temperature,
+            "max_tokens": max_tokens or settings.LLM_MAX_TOKENS
+        }
+        if json_mode:
+            request["response_format"] = {"type": "json_object"}
+        content = await self._run(client, request, timeout or self.timeout)
+        if validate:
+            validate(content)
+        if cache and content:
+            await cache.set(key, content)
+        return content
+
+    @staticmethod
+    def _is_valid(content: str, validate: Optional[Callable[[str], Any]]) -> bool:
+        if validate is None:
+            return True
+        try:
+            validate(content)
+        except Exception:
+            return False
+        return True
+
+    async def _run(self, client: openai.AsyncOpenAI, request: Dict[str, Any], timeout: float) -> str:
+        # 排队等待并发名额的时间不计入超时，避免高负载时请求未发出就超时
+        async with self._semaphore:
+            response = await asyncio.wait_for(client.chat.completions.create(**request), timeout)
+        return response.choices[0].message.content
+
+    async def close(self):
+        """关闭客户端连接池"""
+        if self._client is not None:
+            await self._client.close()
+        self._reset(None)
+
+
+_llm_gateway: Optional[LLMGateway] = None
+
+
+def get_llm_gateway() -> LLMGateway:
+    """获取进程内共享的LLM网关"""
+    global _llm_gateway
+    if _llm_gateway is None:
+        _llm_gateway = LLMGateway(settings.LLM_MAX_CONCURRENCY, settings.LLM_TIMEOUT)
+    return _llm_gateway
+
+
+async def close_llm_gateway():
+    """应用关闭时释放LLM客户端"""
+    if _llm_gateway is not None:
+        await _llm_gateway.close()
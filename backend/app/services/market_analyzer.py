@@ -1,18 +1,33 @@
-import httpx
 import asyncio
-from typing import Dict, Any, List
-from bs4 import BeautifulSoup
-import openai
-from app.core.config import settings
+from typing import Dict, Any, List, Optional
+from app.services.base_analyzer import BaseAnalyzer
 from app.models.analysis import MarketTrends
-import json
+from app.services.analysis_context import AnalysisContext
+from app.services.prompt_builder import build_prompt, Excerpt, JsonContext
+from app.services.structured_output import model_schema, with_schema
 import re
 
-class MarketAnalyzer:
+# 各阶段的输出格式，由结果模型生成
+OUTPUT_SCHEMAS = {
+    "market_trends": model_schema(MarketTrends)
+}
+
+class MarketAnalyzer(BaseAnalyzer):
     """市场趋势分析器"""
     
+    system_prompt = "你是一个专业的市场分析师，擅长分析北美市场的趋势和机会。"
+    fallback_response = {
+        "market_size": {"current": "需要进一步分析"},
+        "cagr": 5.0,
+        "key_drivers": ["技术创新", "市场需求增长"],
+        "growth_forecast": {"2025": "稳定增长"},
+        "market_segments": [{"name": "主要市场", "share": 100}],
+        "industry_trends": ["数字化转型", "可持续发展"]
+    }
+    requires = ("website_content", "industry_info")
+    
     def __init__(self):
-        self.openai_client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+        super().__init__()
         self.market_data_sources = [
             "https://www.statista.com",
             "https://www.grandviewresearch.com",
@@ -20,20 +35,22 @@ class MarketAnalyzer:
             "https://www.ibisworld.com"
         ]
     
-    async def analyze(self, url: str) -> MarketTrends:
+    async def analyze(self, url: str, context: Optional[AnalysisContext] = None) -> MarketTrends:
         """
         分析指定URL的市场趋势
         
         Args:
             url: 要分析的网址
+            context: 任务内共享的分析上下文，未提供时单独创建
             
         Returns:
             MarketTrends: 市场趋势分析结果
         """
         try:
-            # 1. 提取网站内容和行业信息
-            website_content = await self._extract_website_content(url)
-            industry_info = await self._identify_industry(url, website_content)
+            # 1. 获取网站内容和行业信息
+            shared = await (context or AnalysisContext(url)).require(self.requires)
+            website_content = shared["website_content"]
+            industry_info = shared["industry_info"]
             
             # 2. 获取市场数据
             market_data = await self._gather_market_data(industry_info)
@@ -47,50 +64,6 @@ class MarketAnalyzer:
             # 返回基于网站内容的AI分析结果
             return await self._fallback_analysis(url)
     
-    async def _extract_website_content(self, url: str) -> Dict[str, Any]:
-        """提取网站内容"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=30.0)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 提取关键信息
-            title = soup.find('title').get_text() if soup.find('title') else ""
-            description = soup.find('meta', {'name': 'description'})
-            description = description.get('content', '') if description else ""
-            
-            # 提取主要内容
-            main_content = ""
-            for tag in soup.find_all(['h1', 'h2', 'h3', 'p', 'div']):
-                if tag.get_text().strip():
-                    main_content += tag.get_text().strip() + " "
-            
-            return {
-                "title": title,
-                "description": description,
-                "content": main_content[:5000],  # 限制内容长度
-                "url": url
-            }
-    
-    async def _identify_industry(self, url: str, content: Dict[str, Any]) -> Dict[str, Any]:
-        """识别行业类别"""
-        prompt = f"""
-        基于以下网站信息，识别该网站所属的行业类别：
-        
-        URL: {url}
-        标题: {content['title']}
-        描述: {content['description']}
-        内容摘要: {content['content'][:1000]}
-        
-        请返回JSON格式的行业信息，包含：
-        - industry_name: 行业名称
-        - industry_category: 行业分类
-        - key_products: 主要产品/服务
-        - target_market: 目标市场
-        """
-        
-        response = await self._call_openai(prompt)
-        return json.loads(response)
-    
     async def _gather_market_data(self, industry_info: Dict[str, Any]) -> Dict[str, Any]:
         """收集市场数据"""
         # 这里可以集成第三方市场数据API
@@ -117,12 +90,12 @@ class MarketAnalyzer:
     
     async def _analyze_market_trends(self, content: Dict[str, Any], industry_info: Dict[str, Any], market_data: Dict[str, Any]) -> MarketTrends:
         """使用AI分析市场趋势"""
-        prompt = f"""
+        prompt = build_prompt("market_trends", """
         基于以下信息，分析北美市场的市场趋势：
         
-        行业信息: {json.dumps(industry_info, ensure_ascii=False)}
-        市场数据: {json.dumps(market_data, ensure_ascii=False)}
-        网站内容: {content['content'][:2000]}
+        行业信息: {industry_info}
+        市场数据: {market_data}
+        网站内容: {content}
         
         请提供详细的市场趋势分析，包括：
         1. 市场规模评估
@@ -133,10 +106,11 @@ class MarketAnalyzer:
         6. 行业趋势
         
         请以JSON格式返回结果。
-        """
+        """, industry_info=JsonContext(industry_info), market_data=JsonContext(market_data),
+            content=Excerpt(content['content'], 2000),
+            schema=OUTPUT_SCHEMAS["market_trends"])
         
-        response = await self._call_openai(prompt)
-        analysis_data = json.loads(response)
+        analysis_data = await self._call_json(prompt, self.fallback_response)
         
         return MarketTrends(
             market_size=analysis_data.get("market_size", {}),
@@ -155,8 +129,7 @@ class MarketAnalyzer:
         以JSON格式返回。
         """
         
-        response = await self._call_openai(prompt)
-        analysis_data = json.loads(response)
+        analysis_data = await self._call_json(with_schema(prompt, OUTPUT_SCHEMAS["market_trends"]), self.fallback_response)
         
         return MarketTrends(
             market_size=analysis_data.get("market_size", {"current": "N/A"}),
@@ -166,27 +139,3 @@ class MarketAnalyzer:
             market_segments=analysis_data.get("market_segments", []),
             industry_trends=analysis_data.get("industry_trends", [])
         )
-    
-    async def _call_openai(self, prompt: str) -> str:
-        """调用OpenAI API"""
-        try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "你是一个专业的市场分析师，擅长分析北美市场的趋势和机会。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=2000
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            # 返回默认分析结果
-            return json.dumps({
-                "market_size": {"current": "需要进一步分析"},
-                "cagr": 5.0,
-                "key_drivers": ["技术创新", "市场需求增长"],
-                "growth_forecast": {"2025": "稳定增长"},
-                "market_segments": [{"name": "主要市场", "share": 100}],
-                "industry_trends": ["数字化转型", "可持续发展"]
-            }) 
\ No newline at end of file
@@ -0,0 +1,165 @@
+import codecs
+from dataclasses import dataclass
+from typing import Callable, Optional
+from app.core.config import settings
+from app.services.http_client import get_http_client
+from app.services.http_cache import HTTPCache, get_http_cache
+from app.services.fetch_scheduler import get_fetch_scheduler
+
+# 缓存内容交给解析器时的分块大小
+FEED_CHUNK_SIZE = 16384
+
+
+@dataclass
+class FetchedPage:
+    """网页抓取结果"""
+    url: str
+    status_code: int
+    text: str
+    num_bytes: int  # 实际下载的字节数（压缩后）
+    truncated: bool  # 是否因超出字节预算而提前停止
+    from_cache: bool = False  # 是否来自磁盘缓存
+
+
+def fetch_byte_budget() -> int:
+    """单个网页的下载字节预算，由正文长度上限换算"""
+    return settings.MAX_CONTENT_LENGTH * settings.FETCH_BYTES_PER_CHAR
+
+
+def _incremental_decoder(encoding: Optional[str]) -> codecs.IncrementalDecoder:
+    """创建增量解码器，未知编码时退回 UTF-8"""
+    try:
+        return codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    except LookupError:
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
+async def probe_url(url: str, timeout: Optional[float] = None) -> int:
+    """
+    轻量探测URL是否可访问
+
+    先发送 HEAD 请求，服务器不支持 HEAD 时改用只取首字节的范围请求，
+    不下载网页正文。
+
+    Returns:
+        int: HTTP状态码
+    """
+    client = get_http_client()
+    request_kwargs = {"timeout": timeout} if timeout is not None else {}
+
+    async with get_fetch_scheduler().slot(url):
+        response = await client.head(url, **request_kwargs)
+        if response.status_code in (405, 501):
+            async with client.stream("GET", url, headers={"Range": "bytes=0-0"}, **request_kwargs) as response:
+                pass
+    return response.status_code
+
+
+def _feed_text(feed: Optional[Callable[[str], Optional[bool]]], text: str):
+    """将缓存的网页分块交给解析器，解析器收集足够内容后停止"""
+    if feed is None:
+        return
+    for i in range(0, len(text), FEED_CHUNK_SIZE):
+        if feed(text[i:i + FEED_CHUNK_SIZE]):
+            break
+
+
+async def fetch_page(
+    url: str,
+    timeout: Optional[float] = None,
+    feed: Optional[Callable[[str], Optional[bool]]] = None,
+    max_bytes: Optional[int] = None,
+    max_decompressed_bytes: Optional[int] = None,
+    use_cache: bool = True
+) -> FetchedPage:
+    """
+    流式下载网页，达到字节预算后停止读取
+
+    启用磁盘缓存时，TTL 内直接返回缓存内容；过期后发送条件请求，
+    服务器返回 304 时复用缓存的响应体。
+
+    Args:
+        url: 网页地址
+        timeout: 超时时间（秒），默认使用客户端配置
+        feed: 解析器入口，每解码出一段文本即调用一次，返回 True 时停止下载
+        max_bytes: 网络传输字节预算，默认由 MAX_CONTENT_LENGTH 换算
+        max_decompressed_bytes: 解压后字节上限，防止压缩炸弹
+        use_cache: 是否使用磁盘缓存
+
+    Returns:
+        FetchedPage: 抓取结果
+    """
+    cache = get_http_cache() if use_cache else None
+    entry = cache.lookup(url) if cache else None
+
+    if entry and cache.is_fresh(entry):
+        body = await cache.read_body(url, entry)
+        if body is not None:
+            _feed_text(feed, body)
+            return FetchedPage(url=url, status_code=200, text=body, num_bytes=0,
+                               truncated=entry["truncated"], from_cache=True)
+        entry = None
+
+    max_bytes = max_bytes or fetch_byte_budget()
+    max_decompressed_bytes = max_decompressed_bytes or settings.FETCH_MAX_DECOMPRESSED_BYTES
+
+    while True:
+        chunks = []
+        decompressed = 0
+        truncated = False
+        request_kwargs = {"timeout": timeout} if timeout is not None else {}
+        if entry:
+            request_kwargs["headers"] = HTTPCache.conditional_headers(entry)
+
+        async with get_fetch_scheduler().slot(url), \
+                get_http_client().stream("GET", url, **request_kwargs) as response:
+            if entry and response.status_code == 304:
+                body = await cache.read_body(url, entry)
+                if body is not None:
+                    await cache.revalidated(url, entry, response.headers)
+                    _feed_text(feed, body)
+                    return FetchedPage(url=url, status_code=200, text=body,
+                                       num_bytes=response.num_bytes_downloaded,
+                                       truncated=entry["truncated"], from_cache=True)
+                # 缓存的响应体已不存在（被淘汰或索引由其他进程写入），去掉条件请求头重新下载
+                cache.discard(url)
+                entry = None
+                continue
+
+            decoder = _incremental_decoder(response.encoding)
+            async for data in response.aiter_bytes():
+                remaining = max_decompressed_bytes - decompressed
+                if len(data) > remaining:
+                    data = data[:remaining]
+                    truncated = True
+                decompressed += len(data)
+
+                text = decoder.decode(data)
+                if text:
+                    chunks.append(text)
+                    if feed is not None and feed(text):
+                        # 解析器已收集到足够内容
+                        truncated = True
+                        break
+
+                if truncated or response.num_bytes_downloaded >= max_bytes:
+                    truncated = True
+                    break
+
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                chunks.append(tail)
+                if feed is not None:
+                    feed(tail)
+
+            page = FetchedPage(
+                url=url,
+                status_code=response.status_code,
+                text="".join(chunks),
+                num_bytes=response.num_bytes_downloaded,
+                truncated=truncated
+            )
+
+            if cache and response.status_code == 200:
+                await cache.store(url, page.text, response.headers, truncated)
+            return page
@@ -0,0 +1,163 @@
+import os
+import queue
+import asyncio
+import json
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Set, Tuple
+from app.services.redis_client import get_redis, get_sync_redis, mark_redis_failed
+
+CHANNEL_PREFIX = "progress:"
+TERMINAL_STATUSES = ("completed", "failed")
+OUTBOX_MAX_EVENTS = 1000  # 等待发布到 Redis 的事件上限，超出时丢弃（订阅者仍可按状态查询补齐）
+
+
+class ProgressBus:
+    """
+    任务进度事件总线
+
+    任务状态每次变化发布一个事件（状态、进度、各部分状态和已完成部分的结果）。
+    同一进程内直接投递给订阅者；配置了 Redis 时同时通过 pub/sub 转发给其他
+    进程（多个 API 实例、Celery Worker）。事件带状态版本号，订阅者按版本号去重。
+    发布到 Redis 由后台线程完成，Redis 变慢或不可用时不阻塞发布方（包括事件循环）。
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._outbox: Optional[queue.Queue] = None
+        self._outbox_pid: Optional[int] = None
+        self._outbox_lock = threading.Lock()
+
+    def publish(self, event: Dict[str, Any]):
+        """发布事件，可在事件循环外调用，不等待 Redis"""
+        task_id = event["task_id"]
+        for loop, subscriber in list(self._subscribers.get(task_id, ())):
+            loop.call_soon_threadsafe(subscriber.put_nowait, event)
+
+        if get_sync_redis() is not None:
+            try:
+                self._get_outbox().put_nowait(event)
+            except queue.Full:
+                pass
+
+    def _get_outbox(self) -> queue.Queue:
+        """发布线程的事件队列；Worker 进程 fork 后线程不会被继承，需要重新创建"""
+        with self._outbox_lock:
+            if self._outbox is None or self._outbox_pid != os.getpid():
+                self._outbox = queue.Queue(maxsize=OUTBOX_MAX_EVENTS)
+                self._outbox_pid = os.getpid()
+                threading.Thread(target=self._send_events, args=(self._outbox,),
+                                 name="progress-publisher", daemon=True).start()
+            return self._outbox
+
+    @staticmethod
+    def _send_events(outbox: queue.Queue):
+        """后台线程：依次把事件发布到 Redis 频道"""
+        while True:
+            event = outbox.get()
+            redis = get_sync_redis()
+            if redis is None:
+                continue
+            try:
+                redis.publish(CHANNEL_PREFIX + event["task_id"], json.dumps(event, ensure_ascii=False, default=str))
+            except Exception:
+                mark_redis_failed()
+
+    @asynccontextmanager
+    async def subscribe(self, task_id: str) -> AsyncIterator[asyncio.Queue]:
+        """订阅任务事件，返回接收事件的队列；Redis 频道订阅完成后才返回"""
+        entry = (asyncio.get_running_loop(), asyncio.Queue())
+        self._subscribers.setdefault(task_id, set()).add(entry)
+        listener = None
+        pubsub = await self._subscribe_redis(task_id)
+        if pubsub is not None:
+            listener = asyncio.ensure_future(self._listen(pubsub, entry[1]))
+        try:
+            yield entry[1]
+        finally:
+            subscribers = self._subscribers.get(task_id)
+            if subscribers is not None:
+                subscribers.discard(entry)
+                if not subscribers:
+                    del self._subscribers[task_id]
+            if listener is not None:
+                listener.cancel()
+                await asyncio.gather(listener, return_exceptions=True)
+
+    async def watch(self, task_id: str, load_state: Callable[[], Optional[Dict[str, Any]]],
+                    since_version: int = -1, heartbeat: Optional[float] = None) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        依次产生任务的新状态，任务结束后停止
+
+        先订阅再读取当前状态，避免遗漏两者之间的变化。heartbeat 秒内没有新事件时产生 None，
+        供调用方发送心跳。
+
+        Args:
+            task_id: 任务ID
+            load_state: 读取当前状态事件，任务不存在时返回 None
+            since_version: 只产生版本号大于该值的状态
+            heartbeat: 心跳间隔（秒）
+        """
+        async with self.subscribe(task_id) as queue:
+            state = load_state()
+            if state is None:
+                return
+            last_version = since_version
+            while True:
+                if state is not None:
+                    if state["version"] > last_version:
+                        last_version = state["version"]
+                        yield state
+                    # 任务结束后状态不再变化
+                    if state["status"] in TERMINAL_STATUSES:
+                        return
+                try:
+                    state = await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    state = None
+                    yield None
+
+    async def _subscribe_redis(self, task_id: str):
+        redis = get_redis()
+        if redis is None:
+            return None
+        pubsub = redis.pubsub()
+        try:
+            await pubsub.subscribe(CHANNEL_PREFIX + task_id)
+        except Exception:
+            mark_redis_failed()
+            await self._close(pubsub)
+            return None
+        return pubsub
+
+    async def _listen(self, pubsub, queue: asyncio.Queue):
+        """把 Redis 频道中的事件转入订阅队列"""
+        try:
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is not None:
+                    queue.put_nowait(json.loads(message["data"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            mark_redis_failed()
+        finally:
+            await self._close(pubsub)
+
+    @staticmethod
+    async def _close(pubsub):
+        try:
+            await pubsub.aclose()
+        except Exception:
+            pass
+
+
+_progress_bus: Optional[ProgressBus] = None
+
+
+def get_progress_bus() -> ProgressBus:
+    """获取进程内共享的进度事件总线"""
+    global _progress_bus
+    if _progress_bus is None:
+        _progress_bus = ProgressBus()
+    return _progress_bus
@@ -0,0 +1,175 @@
+import re
+import json
+import logging
+import textwrap
+import threading
+from typing import Any, Dict, Iterable, Optional
+from app.core.config import settings
+from app.services.structured_output import with_schema
+
+try:
+    import tiktoken
+except ImportError:  # 可选依赖，未安装时按字符估算
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# 上下文JSON中的长键名缩写
+KEY_ALIASES = {
+    "description": "desc",
+    "market_share": "share",
+    "strengths": "pros",
+    "weaknesses": "cons",
+    "characteristics": "traits"
+}
+
+SENTENCE_PATTERN = re.compile(r"(?<=[。！？!?])|(?<=\.)\s+|\n+|\s{2,}")
+CJK_PATTERN = re.compile(r"[\u3000-\u303f\u4e00-\u9fff\uff00-\uffef]")
+
+
+# 启动时加载的 tiktoken 编码，加载完成前按字符估算
+_encoding = None
+
+
+def _load_encoding(model: str):
+    global _encoding
+    try:
+        try:
+            _encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # 编码文件无法下载等情况退回估算
+        logger.warning("tiktoken encoding unavailable, estimating tokens: %s", e)
+
+
+def load_token_encoding(timeout: float = 10.0) -> bool:
+    """
+    加载 tiktoken 编码（首次使用时需要下载编码文件）
+
+    在后台线程中加载，最多等待 timeout 秒；超时后线程继续加载，
+    加载完成前 count_tokens 按字符估算。应在启动时调用，不要在事件循环中直接调用。
+
+    Returns:
+        bool: 编码是否已可用
+    """
+    if _encoding is None and tiktoken is not None:
+        thread = threading.Thread(target=_load_encoding, args=(settings.LLM_MODEL,), daemon=True)
+        thread.start()
+        thread.join(timeout)
+    return _encoding is not None
+
+
+def count_tokens(text: str) -> int:
+    """计算token数；编码未加载时按中文每字一个、其他约每4字符一个估算"""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    cjk = len(CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _compact(value: Any, fields: Optional[Iterable[str]]) -> Any:
+    """去掉空值，只保留需要的字段并缩写键名"""
+    if isinstance(value, list):
+        items = [_compact(item, fields) for item in value]
+        return [item for item in items if item not in (None, "", [], {})]
+    if isinstance(value, dict):
+        compacted = {}
+        for key, item in value.items():
+            if fields is not None and key not in fields:
+                continue
+            item = _compact(item, None)
+            if item in (None, "", [], {}):
+                continue
+            compacted[KEY_ALIASES.get(key, key)] = item
+        return compacted
+    return value
+
+
+def dedupe_sentences(text: str) -> str:
+    """去掉重复句子（多页面合并时的导航、页脚等）"""
+    seen = set()
+    sentences = []
+    for sentence in SENTENCE_PATTERN.split(text):
+        sentence = sentence.strip()
+        key = sentence.lower()
+        if sentence and key not in seen:
+            seen.add(key)
+            sentences.append(sentence)
+    return " ".join(sentences)
+
+
+class Excerpt:
+    """网页正文摘录：截断到 max_chars，正文已在任务上下文中去重（见 AnalysisContext）"""
+
+    shrinkable = True
+
+    def __init__(self, text: str, max_chars: int):
+        self.raw = self.text = text[:max_chars]
+
+    def shrink(self) -> bool:
+        if len(self.text) < 200:
+            return False
+        self.text = self.text[:len(self.text) * 3 // 4]
+        return True
+
+
+class JsonContext:
+    """结构化上下文：紧凑JSON，超出预算时从列表末尾删减条目"""
+
+    def __init__(self, value: Any, fields: Optional[Iterable[str]] = None):
+        self.raw = json.dumps(value, ensure_ascii=False)
+        self.value = _compact(value, set(fields) if fields is not None else None)
+        self.shrinkable = isinstance(self.value, list)
+        self.text = self._render()
+
+    def _render(self) -> str:
+        return json.dumps(self.value, ensure_ascii=False, separators=(",", ":"))
+
+    def shrink(self) -> bool:
+        if not self.shrinkable or len(self.value) <= 1:
+            return False
+        self.value = self.value[:-1]
+        self.text = self._render()
+        return True
+
+
+def build_prompt(stage: str, template: str, max_tokens: Optional[int] = None,
+                 schema: Optional[Dict[str, Any]] = None, **parts: Any) -> str:
+    """
+    按模板构造提示词并控制输入token数
+
+    模板使用 {name} 占位符；Excerpt、JsonContext 以外的值直接转为字符串。
+    去掉模板缩进，在末尾附加输出格式要求，超出预算时反复缩减当前最长的可缩减部分。
+    输出格式要求不可缩减，计入预算。
+
+    Args:
+        stage: 阶段名称，用于日志
+        template: 提示词模板
+        max_tokens: 输入token上限，默认使用 PROMPT_MAX_INPUT_TOKENS
+        schema: 输出的 JSON Schema
+        **parts: 模板参数
+
+    Returns:
+        str: 提示词
+    """
+    budget = max_tokens or settings.PROMPT_MAX_INPUT_TOKENS
+    raw_prompt = with_schema(template.format(**{name: getattr(part, "raw", part) for name, part in parts.items()}), schema)
+    template = textwrap.dedent(template).strip()
+
+    def render() -> str:
+        return with_schema(template.format(**{name: getattr(part, "text", part) for name, part in parts.items()}), schema)
+
+    prompt = render()
+    tokens = count_tokens(prompt)
+    while tokens > budget:
+        candidates = [part for part in parts.values() if getattr(part, "shrinkable", False)]
+        candidates.sort(key=lambda part: len(part.text), reverse=True)
+        if not any(part.shrink() for part in candidates):
+            break
+        prompt = render()
+        tokens = count_tokens(prompt)
+
+    raw_tokens = count_tokens(raw_prompt)
+    logger.info("prompt %s: %d tokens (raw %d, saved %d)", stage, tokens, raw_tokens, raw_tokens - tokens)
+    return prompt
@@ -0,0 +1,47 @@
+import asyncio
+import time
+from typing import Optional
+from app.core.config import settings
+
+REDIS_RETRY_INTERVAL = 30.0  # Redis 不可用后再次尝试的间隔（秒）
+
+_redis = None
+_redis_loop: Optional[asyncio.AbstractEventLoop] = None
+_sync_redis = None
+_retry_at = 0.0
+
+
+def get_redis():
+    """
+    获取当前事件循环的异步 Redis 客户端
+
+    Redis 是可选依赖：最近一次出错后的一段时间内返回 None，调用方退回进程内实现。
+    """
+    global _redis, _redis_loop
+    if not settings.REDIS_URL or time.monotonic() < _retry_at:
+        return None
+    loop = asyncio.get_running_loop()
+    if _redis is None or _redis_loop is not loop:
+        import redis.asyncio as aioredis
+        _redis = aioredis.from_url(settings.REDIS_URL, socket_connect_timeout=0.5, socket_timeout=0.5)
+        _redis_loop = loop
+    return _redis
+
+
+def get_sync_redis():
+    """获取同步 Redis 客户端，用于不在事件循环中的调用方（如 Celery 任务、数据库操作）"""
+    global _sync_redis
+    if not settings.REDIS_URL or time.monotonic() < _retry_at:
+        return None
+    if _sync_redis is None:
+        import redis
+        _sync_redis = redis.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=0.5, socket_timeout=0.5)
+    return _sync_redis
+
+
+def mark_redis_failed():
+    """Redis 出错后暂停使用一段时间，避免每次调用都等待超时"""
+    global _redis, _sync_redis, _retry_at
+    _redis = None
+    _sync_redis = None
+    _retry_at = time.monotonic() + REDIS_RETRY_INTERVAL
@@ -0,0 +1,154 @@
+import re
+import asyncio
+from typing import Dict, Any, List, Optional, Set, Tuple
+from app.core.config import settings
+from app.services.page_fetcher import fetch_page
+from app.services.url_utils import normalize_url, is_same_site
+
+# 信息量高的页面路径关键词及权重
+PRIORITY_KEYWORDS = {
+    "pricing": 5, "price": 5, "plans": 4, "product": 4, "products": 4,
+    "about": 4, "features": 3, "solutions": 3, "company": 2,
+    "customers": 2, "enterprise": 1, "compare": 1
+}
+
+# 非网页资源
+SKIP_EXTENSIONS = (
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico", ".css", ".js",
+    ".zip", ".gz", ".mp4", ".mp3", ".xml", ".json", ".woff", ".woff2"
+)
+
+SITEMAP_LOC_PATTERN = re.compile(r"<loc>\s*([^<\s]+)\s*</loc>", re.IGNORECASE)
+
+
+def score_url(url: str) -> int:
+    """按路径关键词为候选页面打分，路径越浅越优先"""
+    path = url.split("://", 1)[-1].partition("/")[2].split("?", 1)[0].lower()
+    tokens = set(re.split(r"[^a-z0-9]+", path))
+    score = sum(weight for keyword, weight in PRIORITY_KEYWORDS.items() if keyword in tokens)
+    return score * 10 - path.count("/")
+
+
+def merge_pages(pages: List[Dict[str, Any]], max_chars: int) -> Dict[str, Any]:
+    """将多个页面合并为一个内容包，正文长度按页面平均分配，首页在前"""
+    landing = pages[0]
+    share = max_chars // len(pages)
+
+    sections = []
+    for page in pages:
+        content = page["content"][:share]
+        if content:
+            sections.append(content if page is landing else f"[{page['url']}] {content}")
+
+    keywords = {
+        name: list(dict.fromkeys(word for page in pages for word in page["keywords"].get(name, [])))
+        for name in landing["keywords"]
+    }
+
+    return {
+        "title": landing["title"],
+        "description": landing["description"],
+        "content": " ".join(sections),
+        "keywords": keywords,
+        "links": landing.get("links", []),
+        "url": landing["url"],
+        "pages": [page["url"] for page in pages]
+    }
+
+
+class SiteCrawler:
+    """
+    站内多页面抓取
+
+    从首页链接和 sitemap.xml 中发现同站页面，按路径关键词排序，在页面数和
+    字节预算内并发抓取，最后合并为一个内容包交给各分析器。
+    """
+
+    def __init__(self, content_store, max_pages: Optional[int] = None,
+                 max_bytes: Optional[int] = None, max_depth: Optional[int] = None):
+        self.content_store = content_store
+        self.max_pages = max_pages or settings.CRAWL_MAX_PAGES
+        self.max_bytes = max_bytes or settings.CRAWL_MAX_BYTES
+        self.max_depth = max_depth if max_depth is not None else settings.CRAWL_MAX_DEPTH
+        self._semaphore = asyncio.Semaphore(settings.CRAWL_CONCURRENCY)
+        self._bytes = 0
+
+    async def crawl(self, url: str) -> Dict[str, Any]:
+        """抓取站点并返回合并后的内容包"""
+        landing = await self.content_store.get(url)
+        root = normalize_url(url) or url
+        self._bytes = self.content_store.num_bytes.get(url, 0)
+
+        visited: Set[str] = {root}
+        frontier = self._discover(landing, root, visited)
+        frontier.extend(await self._sitemap_urls(root, visited))
+
+        pages = [landing]
+        depth = 1
+        while frontier and depth <= self.max_depth and len(pages) < self.max_pages:
+            frontier.sort(key=lambda item: item[0], reverse=True)
+            batch = [candidate for _, candidate in frontier[:self.max_pages - len(pages)]]
+            fetched = await asyncio.gather(*(self._fetch(candidate) for candidate in batch))
+
+            frontier = []
+            for page in fetched:
+                if page is None:
+                    continue
+                pages.append(page)
+                if depth < self.max_depth:
+                    frontier.extend(self._discover(page, root, visited))
+            depth += 1
+
+        return merge_pages(pages, settings.MAX_CONTENT_LENGTH)
+
+    def _discover(self, page: Dict[str, Any], root: str, visited: Set[str]) -> List[Tuple[int, str]]:
+        """从页面链接中发现未访问的同站页面，候选队列有上限"""
+        candidates = []
+        for href in page.get("links", []):
+            candidate = self._accept(href, page["url"], root, visited)
+            if candidate:
+                candidates.append((score_url(candidate), candidate))
+        candidates.sort(key=lambda item: item[0], reverse=True)
+        return candidates[:settings.CRAWL_MAX_FRONTIER]
+
+    def _accept(self, href: str, base: str, root: str, visited: Set[str]) -> Optional[str]:
+        """规范化链接并过滤站外、非网页和已访问的地址"""
+        candidate = normalize_url(href, base)
+        if (candidate is None or candidate in visited or not is_same_site(candidate, root)
+                or candidate.split("?", 1)[0].lower().endswith(SKIP_EXTENSIONS)):
+            return None
+        visited.add(candidate)
+        return candidate
+
+    async def _sitemap_urls(self, root: str, visited: Set[str]) -> List[Tuple[int, str]]:
+        """读取站点 sitemap.xml 中的页面地址，sitemap 不存在时返回空列表"""
+        sitemap_url = normalize_url("/sitemap.xml", root)
+        try:
+            fetched = await fetch_page(sitemap_url, max_bytes=settings.CRAWL_SITEMAP_MAX_BYTES)
+        except Exception:
+            return []
+        if fetched.status_code != 200:
+            return []
+
+        self._bytes += fetched.num_bytes
+        candidates = []
+        for loc in SITEMAP_LOC_PATTERN.findall(fetched.text):
+            candidate = self._accept(loc, root, root, visited)
+            if candidate:
+                candidates.append((score_url(candidate), candidate))
+        candidates.sort(key=lambda item: item[0], reverse=True)
+        return candidates[:settings.CRAWL_MAX_FRONTIER]
+
+    async def _fetch(self, url: str) -> Optional[Dict[str, Any]]:
+        """在字节预算内抓取单个页面，失败或超出预算时返回 None"""
+        async with self._semaphore:
+            if self._bytes >= self.max_bytes:
+                return None
+            try:
+                page = await self.content_store.get(url)
+            except Exception:
+                return None
+            self._bytes += self.content_store.num_bytes.get(url, 0)
+            if self.content_store.status_codes.get(url) != 200 or not page["content"]:
+                return None
+            return page
@@ -0,0 +1,84 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# 未设置默认值的阶段失败时，整个阶段图失败
+NO_DEFAULT = object()
+
+
+@dataclass
+class Stage:
+    """
+    分析阶段
+
+    func 以依赖阶段的结果作为同名关键字参数调用。设置 default 时，
+    该阶段出错或超时使用默认值，不影响其他阶段。
+    """
+    name: str
+    func: Callable[..., Awaitable[Any]]
+    requires: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+    default: Any = field(default=NO_DEFAULT, repr=False)
+
+
+async def run_stages(stages: List[Stage], timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    按依赖关系执行阶段图
+
+    每个阶段在依赖全部完成后立即开始，互不依赖的阶段并发执行，
+    总耗时取决于关键路径。LLM请求的并发上限由共享网关控制。
+
+    Args:
+        stages: 阶段列表，依赖必须在列表中声明
+        timeout: 各阶段未单独设置超时时使用的超时（秒）
+
+    Returns:
+        Dict: 阶段名称到结果的映射
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        missing = [name for name in stage.requires if name not in by_name]
+        if missing:
+            raise ValueError(f"阶段 {stage.name} 依赖未声明的阶段: {', '.join(missing)}")
+    _check_acyclic(by_name)
+
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def run(stage: Stage) -> Any:
+        inputs = {name: await tasks[name] for name in stage.requires}
+        try:
+            return await asyncio.wait_for(stage.func(**inputs), stage.timeout or timeout)
+        except Exception:
+            if stage.default is NO_DEFAULT:
+                raise
+            return stage.default
+
+    for stage in stages:
+        tasks[stage.name] = asyncio.ensure_future(run(stage))
+
+    try:
+        await asyncio.gather(*tasks.values())
+    finally:
+        # 某个阶段失败时取消其余阶段，并回收它们的异常
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+    return {name: task.result() for name, task in tasks.items()}
+
+
+def _check_acyclic(by_name: Dict[str, Stage]):
+    """检查阶段之间没有循环依赖"""
+    state: Dict[str, int] = {}  # 1 访问中，2 已完成
+
+    def visit(name: str):
+        if state.get(name) == 2:
+            return
+        if state.get(name) == 1:
+            raise ValueError(f"阶段存在循环依赖: {name}")
+        state[name] = 1
+        for dependency in by_name[name].requires:
+            visit(dependency)
+        state[name] = 2
+
+    for name in by_name:
+        visit(name)
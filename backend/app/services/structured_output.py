@@ -0,0 +1,137 @@
+import re
+import json
+from typing import Any, Dict, Optional, Type
+from pydantic import BaseModel
+from app.core.config import settings
+
+FENCE_PATTERN = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+TRAILING_COMMA_PATTERN = re.compile(r",\s*([}\]])")
+SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+
+STRING_LIST_SCHEMA = {"type": "array", "items": {"type": "string"}}
+
+
+class StructuredOutputError(ValueError):
+    """模型输出无法解析为JSON"""
+
+
+def _extract_json_block(text: str) -> Optional[str]:
+    """取出第一个完整的JSON对象或数组（跳过前后的说明文字）"""
+    start = min((i for i in (text.find("{"), text.find("[")) if i >= 0), default=-1)
+    if start < 0:
+        return None
+    depth = 0
+    in_string = False
+    escaped = False
+    for position in range(start, len(text)):
+        ch = text[position]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:position + 1]
+    return text[start:]
+
+
+def parse_json(text: str) -> Any:
+    """
+    宽松解析模型输出的JSON
+
+    依次尝试：原文、去掉 ``` 代码块标记、截取JSON主体、替换中文引号、去掉尾随逗号。
+
+    Raises:
+        StructuredOutputError: 修复后仍无法解析
+    """
+    if not text:
+        raise StructuredOutputError("模型输出为空")
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+
+    fenced = FENCE_PATTERN.search(text)
+    candidate = fenced.group(1) if fenced else text
+    candidate = _extract_json_block(candidate) or candidate
+    for repaired in (candidate,
+                     TRAILING_COMMA_PATTERN.sub(r"\1", candidate),
+                     TRAILING_COMMA_PATTERN.sub(r"\1", candidate.translate(SMART_QUOTES))):
+        try:
+            return json.loads(repaired)
+        except ValueError:
+            continue
+    raise StructuredOutputError(f"无法解析模型输出: {text[:200]}")
+
+
+def _strip_titles(schema: Any) -> Any:
+    """去掉 pydantic 生成的 title，减少提示词长度"""
+    if isinstance(schema, dict):
+        return {key: _strip_titles(value) for key, value in schema.items() if key != "title"}
+    if isinstance(schema, list):
+        return [_strip_titles(item) for item in schema]
+    return schema
+
+
+def model_schema(model: Type[BaseModel], **fields: str) -> Dict[str, Any]:
+    """
+    由结果模型生成JSON Schema
+
+    Args:
+        model: 结果模型，如 MarketTrends
+        **fields: 输出键名到模型字段名的映射，为空时使用模型的全部字段
+
+    Returns:
+        Dict: 对象类型的 JSON Schema
+    """
+    properties = _strip_titles(model.model_json_schema()["properties"])
+    if not fields:
+        fields = {name: name for name in properties}
+    return {
+        "type": "object",
+        "properties": {key: properties[name] for key, name in fields.items()},
+        "required": list(fields)
+    }
+
+
+def object_schema(**properties: Dict[str, Any]) -> Dict[str, Any]:
+    """构造对象类型的 JSON Schema"""
+    return {"type": "object", "properties": properties, "required": list(properties)}
+
+
+def with_schema(prompt: str, schema: Optional[Dict[str, Any]]) -> str:
+    """在提示词末尾附加输出格式要求"""
+    if schema is None:
+        return prompt + "\n\n只返回JSON，不要包含其他文字。"
+    compact = json.dumps(schema, ensure_ascii=False, separators=(",", ":"))
+    return f"{prompt}\n\n请严格按照以下JSON Schema返回JSON对象，不要包含其他文字：\n{compact}"
+
+
+async def request_json(gateway, prompt: str, system_prompt: str, retries: Optional[int] = None) -> Any:
+    """
+    请求结构化输出并解析
+
+    提示词应已包含输出格式要求（build_prompt(schema=...) 或 with_schema()），
+    这样格式要求计入输入token预算。输出无法解析时只重试本次请求；无法解析的输出不写入响应缓存。
+
+    Raises:
+        StructuredOutputError: 重试后仍无法解析
+    """
+    retries = settings.STRUCTURED_OUTPUT_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        try:
+            response = await gateway.complete(prompt, system_prompt, validate=parse_json,
+                                              json_mode=settings.LLM_JSON_MODE)
+        except StructuredOutputError:
+            if attempt == retries:
+                raise
+            continue
+        return parse_json(response)
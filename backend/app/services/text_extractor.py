@@ -0,0 +1,165 @@
+from html.parser import HTMLParser
+from typing import Dict, Any, List, Optional
+
+try:
+    # lxml 为可选依赖，安装后使用更快的 libxml2 解析器
+    from lxml import etree
+except ImportError:  # pragma: no cover
+    etree = None
+
+# 不可见或样板内容，整棵子树跳过
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "nav", "iframe"}
+
+# 行内标签不打断文本，其余标签视为块边界
+INLINE_TAGS = {
+    "a", "abbr", "b", "bdi", "bdo", "cite", "code", "data", "dfn", "em", "font",
+    "i", "kbd", "mark", "q", "s", "samp", "small", "span", "strong", "sub",
+    "sup", "time", "u", "var", "wbr"
+}
+
+# 每个页面最多收集的链接数
+MAX_LINKS = 500
+
+
+class _TextCollector:
+    """单遍收集可见文本，每个文本节点只输出一次
+
+    以 start/end/data 事件驱动，同时作为 lxml 解析器的 target 使用。
+    """
+
+    def __init__(self, max_chars: Optional[int] = None):
+        self.max_chars = max_chars
+        self.title_parts: List[str] = []
+        self.description = ""
+        self.links: List[str] = []
+        self.parts: List[str] = []
+        self.length = 0
+        self._pending: List[str] = []
+        self._skip_depth = 0
+        self._in_title = False
+
+    @property
+    def full(self) -> bool:
+        """已收集到足够的正文"""
+        return self.max_chars is not None and self.length >= self.max_chars
+
+    def _flush(self):
+        """块边界处输出缓冲的文本节点"""
+        if not self._pending:
+            return
+        text = " ".join("".join(self._pending).split())
+        self._pending = []
+        if text and not self.full:
+            self.parts.append(text)
+            self.length += len(text) + 1
+
+    def start(self, tag: str, attrib: Dict[str, Any]):
+        tag = tag.lower()
+        if tag not in INLINE_TAGS:
+            self._flush()
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag == "meta" and not self.description:
+            if (attrib.get("name") or "").lower() == "description":
+                self.description = attrib.get("content") or ""
+        elif tag == "a" and len(self.links) < MAX_LINKS:
+            # 导航中的链接同样收集，供站内抓取使用
+            href = attrib.get("href")
+            if href:
+                self.links.append(href)
+
+    def end(self, tag: str):
+        tag = tag.lower()
+        if tag not in INLINE_TAGS:
+            self._flush()
+        if tag in SKIP_TAGS:
+            if self._skip_depth:
+                self._skip_depth -= 1
+        elif tag == "title":
+            self._in_title = False
+
+    def data(self, data: str):
+        if self._skip_depth:
+            return
+        if self._in_title:
+            self.title_parts.append(data)
+            return
+        if not self.full:
+            # 文本可能被分块输入截断，缓冲到块边界再输出
+            self._pending.append(data)
+
+    def close(self) -> Dict[str, Any]:
+        self._flush()
+        text = " ".join(self.parts)
+        if self.max_chars is not None:
+            text = text[:self.max_chars]
+        return {
+            "title": "".join(self.title_parts).strip(),
+            "description": self.description,
+            "text": text,
+            "links": self.links
+        }
+
+
+class _StdlibDriver(HTMLParser):
+    """标准库解析器，将事件转发给收集器"""
+
+    def __init__(self, collector: _TextCollector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag, dict(attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        # 自闭合标签没有子节点，不影响跳过深度
+        if tag.lower() not in SKIP_TAGS:
+            self.collector.start(tag, dict(attrs))
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+
+class TextExtractor:
+    """
+    线性时间的网页文本提取器
+
+    支持边下载边解析：每收到一段HTML调用一次 feed()，结束时调用 close()。
+    正文达到 max_chars 后 feed() 返回 True，调用方可停止下载。
+    """
+
+    def __init__(self, max_chars: Optional[int] = None, backend: Optional[str] = None):
+        self.collector = _TextCollector(max_chars)
+        self.backend = backend or ("lxml" if etree is not None else "html.parser")
+        if self.backend == "lxml":
+            self._parser = etree.HTMLParser(target=self.collector)
+        else:
+            self._parser = _StdlibDriver(self.collector)
+
+    def feed(self, data: str) -> bool:
+        """输入一段HTML，返回是否已收集到足够的正文"""
+        self._parser.feed(data)
+        return self.collector.full
+
+    def close(self) -> Dict[str, Any]:
+        """结束解析，返回标题、描述、正文和链接"""
+        if self.backend == "lxml":
+            try:
+                return self._parser.close()
+            except etree.XMLSyntaxError:
+                # 空文档等情况下 lxml 会报错，直接返回已收集的内容
+                return self.collector.close()
+        self._parser.close()
+        return self.collector.close()
+
+
+def extract_text(html: str, max_chars: Optional[int] = None) -> Dict[str, Any]:
+    """一次性提取完整HTML文档的标题、描述、正文和链接"""
+    extractor = TextExtractor(max_chars)
+    extractor.feed(html)
+    return extractor.close()
@@ -0,0 +1,49 @@
+from typing import Optional
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
+
+# 不影响页面内容的跟踪参数
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "yclid", "mc_cid", "mc_eid", "ref", "_ga"}
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str, base: Optional[str] = None) -> Optional[str]:
+    """
+    规范化URL，用于去重
+
+    解析相对地址，小写协议和主机名，去掉默认端口、片段和跟踪参数，
+    查询参数排序。非 http(s) 地址返回 None。
+    """
+    if base:
+        url = urljoin(base, url)
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return None
+
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+
+    netloc = parts.hostname.lower()
+    if port and port != DEFAULT_PORTS[scheme]:
+        netloc = f"{netloc}:{port}"
+
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    ))
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+
+def site_host(url: str) -> str:
+    """站点主机名，忽略 www 前缀"""
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def is_same_site(url: str, root_url: str) -> bool:
+    """是否与根地址属于同一站点（含子域名）"""
+    host, root = site_host(url), site_host(root_url)
+    return bool(host) and (host == root or host.endswith("." + root))
@@ -1,37 +1,63 @@
-import httpx
 import asyncio
-from typing import Dict, Any, List
-from bs4 import BeautifulSoup
-import openai
-from app.core.config import settings
+from typing import Dict, Any, List, Optional
+from app.services.base_analyzer import BaseAnalyzer
 from app.models.analysis import UserProfile
-import json
-import re
+from app.services.analysis_context import AnalysisContext
+from app.services.prompt_builder import build_prompt, Excerpt, JsonContext
+from app.services.structured_output import model_schema, object_schema, with_schema, STRING_LIST_SCHEMA
 
-class UserAnalyzer:
+# 各阶段的输出格式，由结果模型生成
+OUTPUT_SCHEMAS = {
+    "target_audience": model_schema(UserProfile, target_audience="target_audience"),
+    "user_needs": model_schema(UserProfile, needs="user_needs", pain_points="pain_points"),
+    "demographics": model_schema(UserProfile, demographics="demographics", psychographics="psychographics"),
+    "user_behavior": object_schema(
+        purchase_pattern={"type": "string"},
+        usage_pattern={"type": "string"},
+        decision_process={"type": "string"},
+        interaction_style={"type": "string"},
+        preferences=STRING_LIST_SCHEMA
+    ),
+    "user_profile": model_schema(UserProfile)
+}
+
+class UserAnalyzer(BaseAnalyzer):
     """用户画像分析器"""
     
+    system_prompt = "你是一个专业的用户研究分析师，擅长分析用户画像、需求和行为模式。"
+    fallback_response = {
+        "target_audience": [{"name": "主要用户群体", "characteristics": "需要进一步分析"}],
+        "user_needs": ["功能需求", "体验需求"],
+        "pain_points": ["使用复杂", "功能不足"],
+        "user_behavior": {"purchase_pattern": "需要分析", "usage_pattern": "需要分析"},
+        "demographics": {"age_range": "25-45", "income_level": "中等"},
+        "psychographics": {"lifestyle": "现代", "values": "效率"}
+    }
+    requires = ("website_content", "social_data")
+    
     def __init__(self):
-        self.openai_client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+        super().__init__()
         self.social_media_platforms = [
             "facebook.com", "twitter.com", "linkedin.com", 
             "instagram.com", "youtube.com", "tiktok.com"
         ]
     
-    async def analyze(self, url: str) -> UserProfile:
+    async def analyze(self, url: str, context: Optional[AnalysisContext] = None) -> UserProfile:
         """
         分析指定URL的用户画像
         
         Args:
             url: 要分析的网址
+            context: 任务内共享的分析上下文，未提供时单独创建
             
         Returns:
             UserProfile: 用户画像分析结果
         """
         try:
-            # 1. 提取网站内容和用户相关信息
-            website_content = await self._extract_website_content(url)
-            social_media_data = await self._gather_social_media_data(url)
+            # 1. 获取网站内容和用户相关信息
+            shared = await (context or AnalysisContext(url)).require(self.requires)
+            website_content = shared["website_content"]
+            social_media_data = shared["social_data"]
             
             # 2. 分析目标用户群体
             target_audience = await self._analyze_target_audience(website_content, social_media_data)
@@ -58,78 +84,14 @@ class UserAnalyzer:
             # 返回基于网站内容的AI分析结果
             return await self._fallback_analysis(url)
     
-    async def _extract_website_content(self, url: str) -> Dict[str, Any]:
-        """提取网站内容"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=30.0)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 提取关键信息
-            title = soup.find('title').get_text() if soup.find('title') else ""
-            description = soup.find('meta', {'name': 'description'})
-            description = description.get('content', '') if description else ""
-            
-            # 提取主要内容
-            main_content = ""
-            for tag in soup.find_all(['h1', 'h2', 'h3', 'p', 'div']):
-                if tag.get_text().strip():
-                    main_content += tag.get_text().strip() + " "
-            
-            # 提取用户相关关键词
-            user_keywords = self._extract_user_keywords(main_content)
-            
-            return {
-                "title": title,
-                "description": description,
-                "content": main_content[:5000],
-                "user_keywords": user_keywords,
-                "url": url
-            }
-    
-    def _extract_user_keywords(self, content: str) -> List[str]:
-        """提取用户相关关键词"""
-        user_related_words = [
-            "用户", "客户", "消费者", "用户群体", "目标用户", "用户需求",
-            "user", "customer", "consumer", "audience", "target", "need",
-            "pain point", "problem", "solution", "benefit", "value"
-        ]
-        
-        keywords = []
-        content_lower = content.lower()
-        for word in user_related_words:
-            if word.lower() in content_lower:
-                keywords.append(word)
-        
-        return keywords
-    
-    async def _gather_social_media_data(self, url: str) -> Dict[str, Any]:
-        """收集社交媒体数据"""
-        # 这里可以集成社交媒体API
-        # 目前返回模拟数据
-        return {
-            "social_presence": {
-                "facebook": {"followers": 10000, "engagement_rate": 2.5},
-                "twitter": {"followers": 5000, "engagement_rate": 3.2},
-                "linkedin": {"followers": 8000, "engagement_rate": 1.8}
-            },
-            "user_sentiment": {
-                "positive": 65,
-                "neutral": 25,
-                "negative": 10
-            },
-            "top_mentions": [
-                "great product", "easy to use", "good value", "needs improvement"
-            ]
-        }
-    
     async def _analyze_target_audience(self, website_content: Dict[str, Any], social_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """分析目标用户群体"""
-        prompt = f"""
+        prompt = build_prompt("target_audience", """
         基于以下网站信息，分析目标用户群体：
         
-        网站内容: {website_content['content'][:2000]}
-        用户关键词: {website_content['user_keywords']}
-        社交媒体数据: {json.dumps(social_data, ensure_ascii=False)}
+        网站内容: {content}
+        用户关键词: {keywords}
+        社交媒体数据: {social_data}
         
         请识别并分析目标用户群体，包括：
         1. 主要用户群体
@@ -138,20 +100,23 @@ class UserAnalyzer:
         4. 用户规模估计
         
         请以JSON格式返回结果，包含target_audience数组。
-        """
+        """, content=Excerpt(website_content['content'], 2000), keywords=website_content['user_keywords'],
+            social_data=JsonContext(social_data),
+            schema=OUTPUT_SCHEMAS["target_audience"])
         
-        response = await self._call_openai(prompt)
-        analysis_data = json.loads(response)
+        analysis_data = await self._call_json(prompt, {
+            "target_audience": self.fallback_response["target_audience"]
+        })
         
         return analysis_data.get("target_audience", [])
     
     async def _analyze_user_needs_and_pain_points(self, website_content: Dict[str, Any]) -> Dict[str, List[str]]:
         """分析用户需求和痛点"""
-        prompt = f"""
+        prompt = build_prompt("user_needs", """
         基于以下网站内容，分析用户需求和痛点：
         
-        网站内容: {website_content['content'][:2000]}
-        用户关键词: {website_content['user_keywords']}
+        网站内容: {content}
+        用户关键词: {keywords}
         
         请识别：
         1. 用户的主要需求
@@ -159,10 +124,13 @@ class UserAnalyzer:
         3. 用户期望的解决方案
         
         请以JSON格式返回结果，包含needs和pain_points数组。
-        """
+        """, content=Excerpt(website_content['content'], 2000), keywords=website_content['user_keywords'],
+            schema=OUTPUT_SCHEMAS["user_needs"])
         
-        response = await self._call_openai(prompt)
-        analysis_data = json.loads(response)
+        analysis_data = await self._call_json(prompt, {
+            "needs": self.fallback_response["user_needs"],
+            "pain_points": self.fallback_response["pain_points"]
+        })
         
         return {
             "needs": analysis_data.get("needs", []),
@@ -171,11 +139,11 @@ class UserAnalyzer:
     
     async def _analyze_user_behavior(self, website_content: Dict[str, Any], social_data: Dict[str, Any]) -> Dict[str, Any]:
         """分析用户行为模式"""
-        prompt = f"""
+        prompt = build_prompt("user_behavior", """
         基于以下信息，分析用户行为模式：
         
-        网站内容: {website_content['content'][:1500]}
-        社交媒体数据: {json.dumps(social_data, ensure_ascii=False)}
+        网站内容: {content}
+        社交媒体数据: {social_data}
         
         请分析用户行为模式，包括：
         1. 购买行为
@@ -185,27 +153,30 @@ class UserAnalyzer:
         5. 偏好特征
         
         请以JSON格式返回结果。
-        """
+        """, content=Excerpt(website_content['content'], 1500), social_data=JsonContext(social_data),
+            schema=OUTPUT_SCHEMAS["user_behavior"])
         
-        response = await self._call_openai(prompt)
-        return json.loads(response)
+        return await self._call_json(prompt, self.fallback_response["user_behavior"])
     
     async def _analyze_demographics_psychographics(self, target_audience: List[Dict[str, Any]]) -> Dict[str, Any]:
         """分析人口统计学和心理特征"""
-        prompt = f"""
+        prompt = build_prompt("demographics", """
         基于以下目标用户群体信息，分析人口统计学和心理特征：
         
-        目标用户群体: {json.dumps(target_audience, ensure_ascii=False)}
+        目标用户群体: {target_audience}
         
         请分析：
         1. 人口统计学特征（年龄、性别、收入、教育、地理位置等）
         2. 心理特征（价值观、生活方式、兴趣、态度等）
         
         请以JSON格式返回结果，包含demographics和psychographics对象。
-        """
+        """, target_audience=JsonContext(target_audience),
+            schema=OUTPUT_SCHEMAS["demographics"])
         
-        response = await self._call_openai(prompt)
-        analysis_data = json.loads(response)
+        analysis_data = await self._call_json(prompt, {
+            "demographics": self.fallback_response["demographics"],
+            "psychographics": self.fallback_response["psychographics"]
+        })
         
         return {
             "demographics": analysis_data.get("demographics", {}),
@@ -220,8 +191,7 @@ class UserAnalyzer:
         以JSON格式返回。
         """
         
-        response = await self._call_openai(prompt)
-        analysis_data = json.loads(response)
+        analysis_data = await self._call_json(with_schema(prompt, OUTPUT_SCHEMAS["user_profile"]), self.fallback_response)
         
         return UserProfile(
             target_audience=analysis_data.get("target_audience", []),
@@ -231,27 +201,3 @@ class UserAnalyzer:
             demographics=analysis_data.get("demographics", {}),
             psychographics=analysis_data.get("psychographics", {})
         )
-    
-    async def _call_openai(self, prompt: str) -> str:
-        """调用OpenAI API"""
-        try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "你是一个专业的用户研究分析师，擅长分析用户画像、需求和行为模式。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=2000
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            # 返回默认分析结果
-            return json.dumps({
-                "target_audience": [{"name": "主要用户群体", "characteristics": "需要进一步分析"}],
-                "user_needs": ["功能需求", "体验需求"],
-                "pain_points": ["使用复杂", "功能不足"],
-                "user_behavior": {"purchase_pattern": "需要分析", "usage_pattern": "需要分析"},
-                "demographics": {"age_range": "25-45", "income_level": "中等"},
-                "psychographics": {"lifestyle": "现代", "values": "效率"}
-            }) 
\ No newline at end of file
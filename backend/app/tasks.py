@@ -0,0 +1,195 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+from celery import chord, group
+from celery.signals import worker_process_init
+from fastapi.encoders import jsonable_encoder
+from app.celery_app import celery_app
+from app.core.config import settings
+from app.database import database
+from app.database.database import SessionLocal
+from app.models.analysis import AnalysisStatus
+from app.services.analysis_context import AnalysisContext
+from app.services.analysis_coalescer import get_analysis_coalescer
+from app.services.content_store import ContentStore
+from app.services.fingerprint import compute_fingerprint
+from app.services.http_client import close_http_client
+from app.services.llm_cache import llm_cache_bypass
+from app.services.llm_gateway import close_llm_gateway
+from app.services.prompt_builder import load_token_encoding
+from app.services.market_analyzer import MarketAnalyzer
+from app.services.user_analyzer import UserAnalyzer
+from app.services.competitor_analyzer import CompetitorAnalyzer
+
+# 分析部分：结果字段 -> 所属分析类型、分析器、队列、完成提示
+ANALYSIS_SECTIONS = {
+    "market_trends": ("market", MarketAnalyzer, "market", "市场趋势分析完成"),
+    "user_profile": ("user", UserAnalyzer, "user", "用户画像分析完成"),
+    "competitor_analysis": ("competitor", CompetitorAnalyzer, "competitor", "竞争分析完成")
+}
+
+# Worker 进程内的分析器实例，按需创建
+_analyzers: Dict[str, Any] = {}
+
+
+@worker_process_init.connect
+def _init_worker_process(**kwargs):
+    """Worker 进程启动时加载token编码"""
+    load_token_encoding()
+
+
+def _get_analyzer(section: str):
+    if section not in _analyzers:
+        _analyzers[section] = ANALYSIS_SECTIONS[section][1]()
+    return _analyzers[section]
+
+
+def _run(coro, force_refresh: bool = False) -> Any:
+    """在 Worker 中执行协程；每个任务使用新的事件循环，结束时关闭绑定在该循环上的客户端"""
+    async def main():
+        token = llm_cache_bypass.set(force_refresh)
+        try:
+            return await coro
+        finally:
+            llm_cache_bypass.reset(token)
+            await close_http_client()
+            await close_llm_gateway()
+    return asyncio.run(main())
+
+
+def _with_db(func, *args) -> Any:
+    db = SessionLocal()
+    try:
+        return func(db, *args)
+    finally:
+        db.close()
+
+
+def _find_reusable_result(db, url: str, analysis_type: str, fingerprint: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    analysis = database.find_reusable_analysis(
+        db, url, analysis_type, fingerprint,
+        settings.FINGERPRINT_MAX_DISTANCE, settings.FINGERPRINT_MAX_AGE
+    )
+    return analysis.result if analysis else None
+
+
+def _selected_sections(analysis_type: str) -> List[str]:
+    return [name for name, (section_type, *_) in ANALYSIS_SECTIONS.items()
+            if analysis_type in [section_type, "full"]]
+
+
+async def _prepare(task_id: str, url: str, analysis_type: str, crawl: bool, force_refresh: bool,
+                   pages: Optional[Dict[str, Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """抓取网页（复用提交时已抓取的页面）并计算各分析器共用的中间结果，无需继续分析时返回 None"""
+    _with_db(database.update_analysis_status, task_id, AnalysisStatus.PROCESSING, "开始分析...")
+
+    content_store = ContentStore(crawl=crawl, pages=pages)
+    await content_store.get(url)
+    if content_store.status_codes.get(url) != 200:
+        _with_db(database.save_analysis_result, task_id, {}, AnalysisStatus.FAILED, "分析失败: 无法访问提供的URL")
+        return None
+
+    # 网页内容与最近一次分析相同或相近时直接复用结果
+    fingerprint = compute_fingerprint(await content_store.get_bundle(url))
+    if settings.FINGERPRINT_REUSE_ENABLED and not force_refresh:
+        reusable = _with_db(_find_reusable_result, url, analysis_type, fingerprint)
+        if reusable is not None:
+            # 复用的结果不记录指纹，只有实际完成的分析才能被复用
+            _with_db(database.save_analysis_result, task_id, reusable, AnalysisStatus.COMPLETED,
+                     "网页内容未变化，复用最近的分析结果")
+            return None
+
+    sections = _selected_sections(analysis_type)
+    requires = {name for section in sections for name in _get_analyzer(section).requires}
+    artifacts = await AnalysisContext(url, content_store).require(sorted(requires))
+    _with_db(database.update_analysis_sections, task_id, {name: AnalysisStatus.PROCESSING.value for name in sections})
+    return {"sections": sections, "artifacts": jsonable_encoder(artifacts), "fingerprint": fingerprint}
+
+
+def _finish(task_id: str, coalesce_key: Optional[str]):
+    """释放合并锁，把结果写入合并到该任务的其他任务"""
+    if coalesce_key is None:
+        return
+    followers = _run(get_analysis_coalescer().release(coalesce_key, task_id))
+    if followers:
+        _with_db(database.copy_analysis_result, task_id, followers)
+
+
+@celery_app.task(bind=True)
+def prepare_analysis(self, task_id: str, url: str, analysis_type: str = "full", crawl: bool = False,
+                     force_refresh: bool = False, coalesce_key: Optional[str] = None,
+                     pages: Optional[Dict[str, Dict[str, Any]]] = None):
+    """
+    分析流水线的准备阶段
+
+    抓取网页、检查内容指纹，把共用的中间结果交给各分析器任务（各自的队列），
+    全部完成后由 aggregate_analysis 汇总保存。
+    """
+    try:
+        prepared = _run(_prepare(task_id, url, analysis_type, crawl, force_refresh, pages), force_refresh)
+    except Exception as e:
+        _with_db(database.save_analysis_result, task_id, {}, AnalysisStatus.FAILED, f"分析失败: {str(e)}")
+        prepared = None
+    if prepared is None:
+        _finish(task_id, coalesce_key)
+        return None
+
+    header = group(
+        analyze_section.s(prepared["artifacts"], task_id, url, section, force_refresh)
+        .set(queue=ANALYSIS_SECTIONS[section][2])
+        for section in prepared["sections"]
+    )
+    raise self.replace(chord(header, aggregate_analysis.s(task_id, prepared["fingerprint"], coalesce_key)))
+
+
+@celery_app.task(soft_time_limit=settings.MAX_ANALYSIS_DURATION + 30,
+                 time_limit=settings.MAX_ANALYSIS_DURATION + 60)
+def analyze_section(artifacts: Dict[str, Any], task_id: str, url: str, section: str,
+                    force_refresh: bool = False) -> Dict[str, Any]:
+    """单个分析器任务，超时或失败时只标记该部分失败"""
+    analyzer = _get_analyzer(section)
+    context = AnalysisContext(url, artifacts=artifacts)
+    try:
+        result = _run(asyncio.wait_for(analyzer.analyze(url, context), settings.MAX_ANALYSIS_DURATION), force_refresh)
+    except Exception:
+        _with_db(database.update_analysis_section, task_id, section, AnalysisStatus.FAILED)
+        return {"section": section, "status": AnalysisStatus.FAILED.value}
+
+    result = jsonable_encoder(result)
+    _with_db(database.update_analysis_section, task_id, section, AnalysisStatus.COMPLETED, result)
+    _with_db(database.update_analysis_status, task_id, AnalysisStatus.PROCESSING, ANALYSIS_SECTIONS[section][3])
+    return {"section": section, "status": AnalysisStatus.COMPLETED.value, "result": result}
+
+
+@celery_app.task
+def aggregate_analysis(section_results: List[Dict[str, Any]], task_id: str, fingerprint: Dict[str, str],
+                       coalesce_key: Optional[str] = None):
+    """汇总各分析器结果并保存，部分分析失败时保留已完成的部分"""
+    results = {item["section"]: item["result"] for item in section_results
+               if item["status"] == AnalysisStatus.COMPLETED.value}
+    failed = [item["section"] for item in section_results if item["status"] == AnalysisStatus.FAILED.value]
+    try:
+        if not results:
+            _with_db(database.save_analysis_result, task_id, {}, AnalysisStatus.FAILED, "分析失败: 分析超时或出错")
+        elif failed:
+            # 不完整的结果不记录指纹，避免之后被复用
+            _with_db(database.save_analysis_result, task_id, results, AnalysisStatus.COMPLETED,
+                     f"分析完成，以下部分超时或出错: {', '.join(failed)}")
+        else:
+            _with_db(database.save_analysis_result, task_id, results, AnalysisStatus.COMPLETED, "分析完成", fingerprint)
+    finally:
+        _finish(task_id, coalesce_key)
+
+
+def start_analysis_pipeline(task_id: str, url: str, analysis_type: str, crawl: bool = False,
+                            force_refresh: bool = False, coalesce_key: Optional[str] = None,
+                            content_store: Optional[ContentStore] = None):
+    """提交分析流水线，由 Celery Worker 执行；content_store 中已抓取的页面随任务传给 Worker"""
+    prepare_analysis.apply_async(kwargs={
+        "task_id": task_id,
+        "url": url,
+        "analysis_type": analysis_type,
+        "crawl": crawl,
+        "force_refresh": force_refresh,
+        "coalesce_key": coalesce_key,
+        "pages": content_store.export_pages() if content_store is not None else None
+    })
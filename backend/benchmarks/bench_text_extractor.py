@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+网页文本提取基准测试
+
+对比原 _extract_website_content 的 BeautifulSoup 多层 div 遍历与单遍 TextExtractor。
+
+用法:
+    python benchmarks/bench_text_extractor.py                   # 使用内置的大型页面样本
+    python benchmarks/bench_text_extractor.py page1.html ...    # 使用保存的真实网页
+    python benchmarks/bench_text_extractor.py https://www.apple.com ...
+"""
+
+import os
+import sys
+import time
+import random
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from bs4 import BeautifulSoup
+from app.services.text_extractor import TextExtractor, etree
+
+
+def legacy_extract(html: str) -> Dict[str, str]:
+    """原 _extract_website_content 的解析逻辑"""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    title = soup.find('title').get_text() if soup.find('title') else ""
+    description = soup.find('meta', {'name': 'description'})
+    description = description.get('content', '') if description else ""
+
+    main_content = ""
+    for tag in soup.find_all(['h1', 'h2', 'h3', 'p', 'div']):
+        if tag.get_text().strip():
+            main_content += tag.get_text().strip() + " "
+
+    return {"title": title, "description": description, "content": main_content[:5000]}
+
+
+def single_pass_extract(html: str, backend: str) -> Dict[str, str]:
+    """单遍提取，模拟边下载边解析的分块输入"""
+    extractor = TextExtractor(backend=backend)
+    for i in range(0, len(html), 16384):
+        extractor.feed(html[i:i + 16384])
+    return extractor.close()
+
+
+def generate_page(sections: int, depth: int, seed: int = 0) -> str:
+    """生成与常见落地页结构相近的大型页面：深层 div 嵌套、导航、内联脚本"""
+    rng = random.Random(seed)
+    words = ["customer", "pricing", "platform", "value", "team", "product",
+             "用户", "解决方案", "secure", "fast", "compare", "enterprise"]
+
+    def paragraph() -> str:
+        return " ".join(rng.choice(words) for _ in range(rng.randint(20, 60)))
+
+    parts = [
+        "<!DOCTYPE html><html><head><title>Benchmark Landing Page</title>",
+        '<meta name="description" content="Synthetic landing page for benchmarks">',
+        "<script>" + "var analytics = {};" * 2000 + "</script>",
+        "<style>" + ".c{color:red}" * 2000 + "</style></head><body>",
+        "<nav>" + "".join(f'<a href="/p{i}">Link {i}</a>' for i in range(200)) + "</nav>"
+    ]
+    for s in range(sections):
+        parts.append("<div class='wrapper'>" * depth)
+        parts.append(f"<h2>Section {s}</h2>")
+        for _ in range(5):
+            parts.append(f"<p>{paragraph()} <a href='#'>more</a></p>")
+        parts.append("</div>" * depth)
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def load_fixtures(args: List[str]) -> List[Tuple[str, str]]:
+    """读取命令行指定的网页文件或URL，未指定时使用内置样本"""
+    if not args:
+        return [
+            ("generated-shallow", generate_page(sections=400, depth=3)),
+            ("generated-deep", generate_page(sections=200, depth=25, seed=1)),
+        ]
+
+    fixtures = []
+    for arg in args:
+        if arg.startswith(("http://", "https://")):
+            response = httpx.get(arg, timeout=30.0, follow_redirects=True)
+            fixtures.append((arg, response.text))
+        else:
+            with open(arg, encoding="utf-8", errors="replace") as f:
+                fixtures.append((os.path.basename(arg), f.read()))
+    return fixtures
+
+
+def timeit(func, *args, repeat: int = 3) -> float:
+    """多次运行取最快耗时（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    backends = ["html.parser"] + (["lxml"] if etree is not None else [])
+
+    for name, html in load_fixtures(sys.argv[1:]):
+        print(f"\n{'='*60}")
+        print(f"{name}: {len(html) / 1024:.0f} KB")
+        print(f"{'='*60}")
+
+        legacy_time = timeit(legacy_extract, html)
+        print(f"  legacy (BeautifulSoup 多层遍历): {legacy_time * 1000:9.1f} ms")
+
+        for backend in backends:
+            elapsed = timeit(single_pass_extract, html, backend)
+            print(f"  TextExtractor[{backend:11s}]:     {elapsed * 1000:9.1f} ms  "
+                  f"({legacy_time / elapsed:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
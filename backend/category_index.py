@@ -0,0 +1,98 @@
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+DEFAULT_CATEGORY = "通用消费品市场"
+
+# 品牌-市场类别映射数据文件，格式为 {类别: [品牌标识, ...]}
+DEFAULT_MAPPING_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "brand_categories.json")
+
+# 常见的多段公共后缀，用于确定注册域名（如 amazon.co.uk 的注册标签为 amazon）
+MULTI_PART_SUFFIXES = {
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "com.cn", "net.cn", "org.cn", "gov.cn",
+    "com.hk", "com.tw", "com.au", "net.au", "co.jp", "ne.jp", "co.kr", "co.in",
+    "com.sg", "com.br", "com.mx", "com.tr", "co.nz", "co.za", "com.ar", "com.my"
+}
+
+# 不代表品牌的主机标签
+IGNORED_LABELS = {"www", "m", "mobile", "en", "cn", "us", "shop", "store", "app", "api"}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def registered_label(host: str) -> Optional[str]:
+    """注册域名中去掉公共后缀后的标签，如 store.apple.com.cn -> apple"""
+    labels = [label for label in host.lower().strip(".").split(".") if label]
+    if len(labels) < 2:
+        return labels[0] if labels else None
+    suffix_size = 2 if ".".join(labels[-2:]) in MULTI_PART_SUFFIXES and len(labels) > 2 else 1
+    return labels[-suffix_size - 1]
+
+
+class CategoryIndex:
+    """
+    品牌到市场类别的索引
+
+    按主机名查找：先查注册域名标签，再查子域名标签（连字符拆分后逐段查找），
+    最后回退到路径中的词。每次查找都是字典 O(1) 操作，与映射条目数量无关。
+    查询参数不参与匹配，避免 ?ref=apple 之类的误判。
+    """
+
+    def __init__(self, mapping: Dict[str, str], default: str = DEFAULT_CATEGORY):
+        self.default = default
+        self._brands = {brand.lower(): category for brand, category in mapping.items()}
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_MAPPING_FILE) -> "CategoryIndex":
+        """从 JSON 文件加载映射"""
+        with open(path, "r", encoding="utf-8") as f:
+            grouped = json.load(f)
+        return cls({brand: category for category, brands in grouped.items() for brand in brands})
+
+    def __len__(self) -> int:
+        return len(self._brands)
+
+    def _lookup_label(self, label: str) -> Optional[str]:
+        category = self._brands.get(label)
+        if category is None and "-" in label:
+            for part in label.split("-"):
+                category = self._brands.get(part)
+                if category:
+                    break
+        return category
+
+    def classify(self, url: str) -> str:
+        """识别单个URL的市场类别"""
+        if "://" not in url:
+            url = "http://" + url
+        try:
+            parts = urlsplit(url.strip())
+            host = (parts.hostname or "").lower()
+        except ValueError:
+            return self.default
+
+        registered = registered_label(host)
+        if registered:
+            category = self._lookup_label(registered)
+            if category:
+                return category
+
+            labels = host.split(".")
+            for label in labels[:labels.index(registered)]:
+                if label not in IGNORED_LABELS:
+                    category = self._lookup_label(label)
+                    if category:
+                        return category
+
+        for token in TOKEN_PATTERN.findall(parts.path.lower()):
+            category = self._brands.get(token)
+            if category:
+                return category
+
+        return self.default
+
+    def classify_many(self, urls: Iterable[str]) -> List[str]:
+        """批量识别市场类别，结果顺序与输入一致"""
+        return [self.classify(url) for url in urls]
@@ -1,10 +1,11 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Header, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel, HttpUrl
-from typing import Optional, Dict, Any
-import httpx
+from typing import Optional, Dict, Any, List
 import asyncio
+import json
 from datetime import datetime
 import uuid
 
@@ -12,9 +13,21 @@ from app.core.config import settings
 from app.services.market_analyzer import MarketAnalyzer
 from app.services.user_analyzer import UserAnalyzer
 from app.services.competitor_analyzer import CompetitorAnalyzer
+from app.services.content_store import ContentStore
+from app.services.analysis_context import AnalysisContext
+from app.services.http_client import start_http_client, close_http_client
+from app.services.llm_gateway import close_llm_gateway
+from app.services.llm_cache import get_llm_cache, llm_cache_bypass
+from app.services.page_fetcher import probe_url
+from app.services.analysis_coalescer import get_analysis_coalescer, coalesce_key
+from app.services.fingerprint import compute_fingerprint
+from app.services.progress_bus import get_progress_bus
+from app.services.prompt_builder import load_token_encoding
 from app.models.analysis import AnalysisRequest, AnalysisResponse, AnalysisStatus
-from app.database.database import get_db, AnalysisModel
+from app.database import database
+from app.database.database import get_db, create_tables, AnalysisModel, SessionLocal
 from app.celery_app import celery_app
+from app.tasks import start_analysis_pipeline
 
 app = FastAPI(
     title="北美市场洞察工具",
@@ -36,6 +49,26 @@ market_analyzer = MarketAnalyzer()
 user_analyzer = UserAnalyzer()
 competitor_analyzer = CompetitorAnalyzer()
 
+# 分析部分：结果字段、所属分析类型、分析器、完成提示
+ANALYSIS_SECTIONS = [
+    ("market_trends", "market", market_analyzer, "市场趋势分析完成"),
+    ("user_profile", "user", user_analyzer, "用户画像分析完成"),
+    ("competitor_analysis", "competitor", competitor_analyzer, "竞争分析完成")
+]
+
+@app.on_event("startup")
+async def startup():
+    """创建或升级数据库表，创建进程内共享的HTTP连接池，在后台线程中加载token编码"""
+    await asyncio.to_thread(create_tables)
+    await start_http_client()
+    await asyncio.to_thread(load_token_encoding)
+
+@app.on_event("shutdown")
+async def shutdown():
+    """关闭HTTP连接池和LLM客户端"""
+    await close_http_client()
+    await close_llm_gateway()
+
 @app.get("/")
 async def root():
     """健康检查端点"""
@@ -55,21 +88,55 @@ async def analyze_url(request: AnalysisRequest, background_tasks: BackgroundTask
     """
     try:
         # 验证URL可访问性
-        async with httpx.AsyncClient() as client:
-            response = await client.get(str(request.url), timeout=10.0)
-            if response.status_code != 200:
-                raise HTTPException(status_code=400, detail="无法访问提供的URL")
+        url = str(request.url)
+        content_store = ContentStore(crawl=request.crawl)
+        if not await check_url_admission(url, content_store):
+            raise HTTPException(status_code=400, detail="无法访问提供的URL")
         
         # 生成分析任务ID
         task_id = str(uuid.uuid4())
+        create_task_record(task_id, url, request.analysis_type)
         
-        # 启动后台分析任务
-        background_tasks.add_task(
-            perform_analysis,
-            task_id=task_id,
-            url=str(request.url),
-            analysis_type=request.analysis_type
-        )
+        # 相同的分析进行中时挂到该任务上，完成后共享结果
+        key = None
+        if settings.ANALYSIS_COALESCING_ENABLED and not request.force_refresh:
+            key = coalesce_key(url, request.analysis_type, request.crawl)
+            leader_id = await get_analysis_coalescer().join(key, task_id)
+            if leader_id is not None:
+                message = f"相同的分析正在进行，结果将与任务 {leader_id} 共享"
+                update_task_status(task_id, AnalysisStatus.PROCESSING, message)
+                return AnalysisResponse(
+                    task_id=task_id,
+                    status=AnalysisStatus.PROCESSING,
+                    message=message,
+                    created_at=datetime.utcnow()
+                )
+        
+        # 启动后台分析任务：启用 Celery 时交给 Worker，否则在API进程内执行
+        if settings.CELERY_ENABLED:
+            try:
+                start_analysis_pipeline(
+                    task_id=task_id,
+                    url=url,
+                    analysis_type=request.analysis_type,
+                    crawl=request.crawl,
+                    force_refresh=request.force_refresh,
+                    coalesce_key=key,
+                    content_store=content_store
+                )
+            except Exception as e:
+                await abort_task(task_id, key, f"分析任务启动失败: {str(e)}")
+                raise
+        else:
+            background_tasks.add_task(
+                perform_analysis,
+                task_id=task_id,
+                url=url,
+                analysis_type=request.analysis_type,
+                content_store=content_store,
+                force_refresh=request.force_refresh,
+                coalesce_key=key
+            )
         
         return AnalysisResponse(
             task_id=task_id,
@@ -81,17 +148,56 @@ async def analyze_url(request: AnalysisRequest, background_tasks: BackgroundTask
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"分析任务启动失败: {str(e)}")
 
+async def abort_task(task_id: str, key: Optional[str], message: str):
+    """任务未能启动：释放合并锁，任务和已合并到该任务的跟随任务标记为失败"""
+    followers = await get_analysis_coalescer().release(key, task_id) if key is not None else []
+    for failed_id in [task_id] + followers:
+        update_task_status(failed_id, AnalysisStatus.FAILED, message)
+
+async def check_url_admission(url: str, content_store: ContentStore) -> bool:
+    """
+    提交任务时检查URL可访问性，检查方式由 ADMISSION_CHECK_MODE 决定
+    
+    Args:
+        url: 要分析的URL
+        content_store: 任务内共享的网页内容存储，完整抓取时网页留给后台分析复用
+    
+    Returns:
+        bool: 是否接受该任务
+    """
+    mode = settings.ADMISSION_CHECK_MODE
+    if mode == "skip":
+        return True
+    if mode == "get":
+        await content_store.get(url, timeout=settings.ADMISSION_TIMEOUT)
+        return content_store.status_codes.get(url) == 200
+    
+    status_code = await probe_url(url, timeout=settings.ADMISSION_TIMEOUT)
+    return status_code in (200, 206)
+
 @app.get("/api/analysis/{task_id}", response_model=AnalysisResponse)
-async def get_analysis_status(task_id: str):
+async def get_analysis_status(
+    task_id: str,
+    wait: Optional[float] = Query(default=None, ge=0, description="长轮询等待秒数，需同时提供 since_version"),
+    since_version: Optional[int] = Query(default=None, description="客户端已有的状态版本号")
+):
     """
     获取分析任务状态和结果
     
+    提供 wait 和 since_version 时为长轮询：状态版本号大于 since_version 或等待超时后才返回，
+    等待时间不超过 LONG_POLL_MAX_WAIT。
+    
     Args:
         task_id: 分析任务ID
+        wait: 长轮询等待秒数
+        since_version: 客户端已有的状态版本号
     
     Returns:
         AnalysisResponse: 分析结果或状态
     """
+    if wait and since_version is not None:
+        await wait_for_task_change(task_id, since_version, min(wait, settings.LONG_POLL_MAX_WAIT))
+    
     try:
         # 从数据库获取分析结果
         db = next(get_db())
@@ -106,13 +212,70 @@ async def get_analysis_status(task_id: str):
             result=analysis.result,
             message=analysis.message,
             created_at=analysis.created_at,
-            completed_at=analysis.completed_at
+            completed_at=analysis.completed_at,
+            progress=analysis.progress,
+            sections=analysis.sections,
+            version=analysis.version
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取分析结果失败: {str(e)}")
 
-async def perform_analysis(task_id: str, url: str, analysis_type: str = "full"):
+@app.get("/api/analysis/{task_id}/events")
+async def stream_analysis_events(task_id: str, last_event_id: Optional[str] = Header(default=None)):
+    """
+    以 Server-Sent Events 推送任务状态变化，替代轮询
+    
+    连接后先推送当前状态，之后每次状态变化推送一个 progress 事件（字段与状态查询接口相同），
+    任务结束后关闭连接。断线重连时按 Last-Event-ID（状态版本号）跳过已收到的状态。
+    
+    Args:
+        task_id: 分析任务ID
+        last_event_id: 浏览器重连时携带的最后事件ID
+    """
+    if load_task_event(task_id) is None:
+        raise HTTPException(status_code=404, detail="分析任务不存在")
+    since_version = int(last_event_id) if last_event_id and last_event_id.isdigit() else -1
+    
+    async def stream():
+        events = get_progress_bus().watch(
+            task_id, lambda: load_task_event(task_id), since_version,
+            heartbeat=settings.PROGRESS_HEARTBEAT_INTERVAL
+        )
+        async for event in events:
+            if event is None:
+                yield ": heartbeat\n\n"
+            else:
+                yield f"id: {event['version']}\nevent: progress\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+    
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.websocket("/api/analysis/{task_id}/events")
+async def analysis_events_websocket(websocket: WebSocket, task_id: str):
+    """以 WebSocket 推送任务状态变化，消息内容与 SSE 的 progress 事件相同"""
+    await websocket.accept()
+    if load_task_event(task_id) is None:
+        await websocket.close(code=4404)
+        return
+    events = get_progress_bus().watch(
+        task_id, lambda: load_task_event(task_id),
+        heartbeat=settings.PROGRESS_HEARTBEAT_INTERVAL
+    )
+    try:
+        async for event in events:
+            await websocket.send_json(event if event is not None else {"heartbeat": True})
+    except WebSocketDisconnect:
+        return
+    await websocket.close()
+
+@app.get("/api/cache/llm")
+async def get_llm_cache_stats():
+    """LLM响应缓存命中统计"""
+    cache = get_llm_cache()
+    return {"enabled": cache is not None, **(cache.stats() if cache else {})}
+
+async def perform_analysis(task_id: str, url: str, analysis_type: str = "full", content_store: Optional[ContentStore] = None, force_refresh: bool = False, coalesce_key: Optional[str] = None):
     """
     执行市场分析的后台任务
     
@@ -120,41 +283,149 @@ async def perform_analysis(task_id: str, url: str, analysis_type: str = "full"):
         task_id: 任务ID
         url: 要分析的URL
         analysis_type: 分析类型 (market, user, competitor, full)
+        content_store: 任务内共享的网页内容存储，所有分析器只抓取一次网页
+        force_refresh: 为 True 时不复用内容未变化的历史结果，也不读取LLM响应缓存
+        coalesce_key: 合并键，任务结束后把结果写入合并到该任务的其他任务
     """
+    bypass_token = llm_cache_bypass.set(force_refresh)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.MAX_ANALYSIS_DURATION
     try:
         # 更新任务状态为进行中
         update_task_status(task_id, AnalysisStatus.PROCESSING, "开始分析...")
         
         results = {}
+        content_store = content_store or ContentStore()
+        
+        # 抓取网页（提交时已完整抓取则直接复用），提交时未检查的URL在这里确认可访问
+        await content_store.get(url)
+        if content_store.status_codes.get(url) != 200:
+            save_analysis_result(task_id, {}, AnalysisStatus.FAILED, "分析失败: 无法访问提供的URL")
+            return
+        
+        # 网页内容与最近一次分析相同或相近时直接复用结果
+        fingerprint = compute_fingerprint(await content_store.get_bundle(url))
+        if settings.FINGERPRINT_REUSE_ENABLED and not force_refresh:
+            reusable = find_reusable_result(url, analysis_type, fingerprint)
+            if reusable is not None:
+                # 复用的结果不记录指纹：只有实际完成的分析才能被复用，避免有效期顺延和相近内容链式匹配
+                save_analysis_result(task_id, reusable, AnalysisStatus.COMPLETED, "网页内容未变化，复用最近的分析结果")
+                return
         
-        # 根据分析类型执行相应的分析
-        if analysis_type in ["market", "full"]:
-            results["market_trends"] = await market_analyzer.analyze(url)
-            update_task_status(task_id, AnalysisStatus.PROCESSING, "市场趋势分析完成")
+        # 根据分析类型并发执行相应的分析，网页内容、行业信息等中间结果在分析器之间共享
+        # 每个部分完成后立即保存，查询接口可以先返回已完成的部分
+        context = AnalysisContext(url, content_store)
+        selected = [(name, analyzer, message) for name, section_type, analyzer, message in ANALYSIS_SECTIONS
+                    if analysis_type in [section_type, "full"]]
+        sections = {name: AnalysisStatus.PROCESSING.value for name, _, _ in selected}
+        update_task_sections(task_id, sections)
         
-        if analysis_type in ["user", "full"]:
-            results["user_profile"] = await user_analyzer.analyze(url)
-            update_task_status(task_id, AnalysisStatus.PROCESSING, "用户画像分析完成")
+        async def run_section(name: str, analyzer, message: str):
+            # 每个分析器使用任务剩余的时间预算，超时或失败只影响该部分
+            remaining = max(deadline - loop.time(), 0)
+            try:
+                result = await asyncio.wait_for(analyzer.analyze(url, context), remaining)
+            except Exception:
+                sections[name] = AnalysisStatus.FAILED.value
+                update_task_sections(task_id, sections)
+                return
+            results[name] = jsonable_encoder(result)
+            sections[name] = AnalysisStatus.COMPLETED.value
+            update_task_sections(task_id, sections, name, results[name])
+            update_task_status(task_id, AnalysisStatus.PROCESSING, message)
         
-        if analysis_type in ["competitor", "full"]:
-            results["competitor_analysis"] = await competitor_analyzer.analyze(url)
-            update_task_status(task_id, AnalysisStatus.PROCESSING, "竞争分析完成")
+        await asyncio.gather(*(run_section(name, analyzer, message) for name, analyzer, message in selected))
         
-        # 保存分析结果
-        save_analysis_result(task_id, results, AnalysisStatus.COMPLETED, "分析完成")
+        # 保存分析结果，部分分析失败时保留已完成的部分
+        failed = [name for name, status in sections.items() if status == AnalysisStatus.FAILED.value]
+        if not results:
+            save_analysis_result(task_id, {}, AnalysisStatus.FAILED, "分析失败: 分析超时或出错")
+        elif failed:
+            # 不完整的结果不记录指纹，避免之后被复用
+            save_analysis_result(task_id, results, AnalysisStatus.COMPLETED, f"分析完成，以下部分超时或出错: {', '.join(failed)}")
+        else:
+            save_analysis_result(task_id, results, AnalysisStatus.COMPLETED, "分析完成", fingerprint)
         
     except Exception as e:
         save_analysis_result(task_id, {}, AnalysisStatus.FAILED, f"分析失败: {str(e)}")
+    finally:
+        llm_cache_bypass.reset(bypass_token)
+        if coalesce_key is not None:
+            followers = await get_analysis_coalescer().release(coalesce_key, task_id)
+            copy_task_result(task_id, followers)
+
+def create_task_record(task_id: str, url: str, analysis_type: str):
+    """创建任务记录"""
+    db = SessionLocal()
+    try:
+        database.create_analysis_task(db, task_id, url, analysis_type)
+    finally:
+        db.close()
 
 def update_task_status(task_id: str, status: AnalysisStatus, message: str):
     """更新任务状态"""
-    # 这里应该更新数据库中的任务状态
-    pass
+    db = SessionLocal()
+    try:
+        database.update_analysis_status(db, task_id, status, message)
+    finally:
+        db.close()
 
-def save_analysis_result(task_id: str, results: Dict[str, Any], status: AnalysisStatus, message: str):
+def update_task_sections(task_id: str, sections: Dict[str, str], section: Optional[str] = None, value: Any = None):
+    """更新各分析部分的状态，section 不为空时同时保存该部分结果"""
+    db = SessionLocal()
+    try:
+        database.update_analysis_sections(db, task_id, sections, section, value)
+    finally:
+        db.close()
+
+def save_analysis_result(task_id: str, results: Dict[str, Any], status: AnalysisStatus, message: str, fingerprint: Optional[Dict[str, str]] = None):
     """保存分析结果到数据库"""
-    # 这里应该保存结果到数据库
-    pass
+    db = SessionLocal()
+    try:
+        database.save_analysis_result(db, task_id, results, status, message, fingerprint)
+    finally:
+        db.close()
+
+def copy_task_result(source_task_id: str, task_ids: List[str]):
+    """把任务结果写入合并到该任务的其他任务"""
+    if not task_ids:
+        return
+    db = SessionLocal()
+    try:
+        database.copy_analysis_result(db, source_task_id, task_ids)
+    finally:
+        db.close()
+
+async def wait_for_task_change(task_id: str, since_version: int, timeout: float):
+    """等待任务状态版本号超过 since_version，任务已结束或超时时直接返回"""
+    changes = get_progress_bus().watch(task_id, lambda: load_task_event(task_id), since_version)
+    try:
+        await asyncio.wait_for(changes.__anext__(), timeout)
+    except (asyncio.TimeoutError, StopAsyncIteration):
+        pass
+    finally:
+        await changes.aclose()
+
+def load_task_event(task_id: str) -> Optional[Dict[str, Any]]:
+    """读取任务当前状态事件，任务不存在时返回 None"""
+    db = SessionLocal()
+    try:
+        analysis = database.get_analysis_by_task_id(db, task_id)
+        return database.progress_event(analysis) if analysis else None
+    finally:
+        db.close()
+
+def find_reusable_result(url: str, analysis_type: str, fingerprint: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """查找内容指纹匹配的最近分析结果"""
+    db = SessionLocal()
+    try:
+        analysis = database.find_reusable_analysis(
+            db, url, analysis_type, fingerprint,
+            settings.FINGERPRINT_MAX_DISTANCE, settings.FINGERPRINT_MAX_AGE
+        )
+        return analysis.result if analysis else None
+    finally:
+        db.close()
 
 if __name__ == "__main__":
     import uvicorn
@@ -75,31 +75,21 @@ async def analyze_url(request: dict):
     }
 
 async def process_analysis(task_id: str):
-    """使用新的分析引擎处理分析"""
-    steps = [
-        ("正在访问网站...", 10),
-        ("正在识别市场类别...", 20),
-        ("正在分析市场趋势...", 35),
-        ("正在分析用户画像...", 50),
-        ("正在分析竞争格局...", 70),
-        ("正在生成战略建议...", 85),
-        ("正在验证数据来源...", 95),
-        ("分析完成！", 100)
-    ]
-    
-    for message, progress in steps:
+    """使用新的分析引擎处理分析，进度由分析引擎的阶段事件驱动"""
+    def on_progress(stage: str, message: str, progress: int):
+        task_status[task_id]["stage"] = stage
         task_status[task_id]["message"] = message
         task_status[task_id]["progress"] = progress
-        await asyncio.sleep(1.5)
     
     # 使用新的分析引擎进行分析
     url = task_status[task_id]["url"]
     try:
-        analysis_result = await analysis_engine.analyze_url(url)
+        analysis_result = await analysis_engine.analyze_url(url, progress_callback=on_progress)
         serialized_result = DataSerializer.serialize_analysis_result(analysis_result)
         
         task_status[task_id]["status"] = "completed"
         task_status[task_id]["progress"] = 100
+        task_status[task_id]["message"] = "分析完成！"
         task_status[task_id]["completed_at"] = datetime.now().isoformat()
         task_status[task_id]["result"] = serialized_result
         
@@ -122,6 +112,7 @@ async def get_analysis_result(task_id: str):
             "status": "processing",
             "progress": task_info["progress"],
             "message": task_info["message"],
+            "stage": task_info.get("stage"),
             "url": task_info["url"],
             "analysis_type": task_info["analysis_type"]
         }
@@ -0,0 +1,102 @@
+import os
+import asyncio
+import tempfile
+from types import SimpleNamespace
+import pytest
+
+# 测试使用临时 SQLite 数据库和缓存目录，不连接 Redis 和 LLM 接口
+_tmp_dir = tempfile.mkdtemp(prefix="market-insight-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'test.db')}"
+os.environ["HTTP_CACHE_DIR"] = os.path.join(_tmp_dir, "http")
+os.environ["REDIS_URL"] = ""
+os.environ["OPENAI_API_KEY"] = "test"
+os.environ["LLM_CACHE_ENABLED"] = "false"
+
+
+class FakeOpenAI:
+    """AsyncOpenAI 替身：记录请求，按提示词生成回复"""
+
+    instances = []
+    reply = staticmethod(lambda prompt: "reply")
+    delay = 0.0
+
+    def __init__(self, **kwargs):
+        self.requests = []
+        self.closed = False
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        FakeOpenAI.instances.append(self)
+
+    async def create(self, **request):
+        self.requests.append(request)
+        await asyncio.sleep(self.delay)
+        content = self.reply(request["messages"][-1]["content"])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    import openai
+    from app.services import llm_gateway
+    monkeypatch.setattr(openai, "AsyncOpenAI", FakeOpenAI)
+    monkeypatch.setattr(FakeOpenAI, "instances", [])
+    monkeypatch.setattr(FakeOpenAI, "reply", FakeOpenAI.__dict__["reply"])
+    monkeypatch.setattr(FakeOpenAI, "delay", FakeOpenAI.delay)
+    monkeypatch.setattr(llm_gateway, "_llm_gateway", None)
+    return FakeOpenAI
+
+
+@pytest.fixture
+def tables():
+    """在测试数据库中创建表"""
+    from app.database.database import create_tables
+    create_tables()
+
+
+class FakeRedis:
+    """
+    进程内的异步 Redis 替身，实现合并器用到的命令
+
+    eval 按脚本内容分派到等价的 Python 实现（不执行 Lua）。
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.lists = {}
+        self.ttls = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value.encode("utf-8")
+        self.ttls[key] = ex
+        return True
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def eval(self, script, numkeys, lock_key, list_key, *args):
+        from app.services.analysis_coalescer import JOIN_SCRIPT, RELEASE_SCRIPT
+        if script == JOIN_SCRIPT:
+            leader, task_id, ttl = args
+            if self.values.get(lock_key) != leader.encode("utf-8"):
+                return 0
+            self.lists.setdefault(list_key, []).append(task_id.encode("utf-8"))
+            self.ttls[list_key] = ttl
+            return 1
+        if script == RELEASE_SCRIPT:
+            (task_id,) = args
+            if self.values.get(lock_key) == task_id.encode("utf-8"):
+                del self.values[lock_key]
+            return self.lists.pop(list_key, [])
+        raise NotImplementedError(script)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    from app.services import analysis_coalescer
+    redis = FakeRedis()
+    monkeypatch.setattr(analysis_coalescer, "get_redis", lambda: redis)
+    return redis
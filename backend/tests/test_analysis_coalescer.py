@@ -0,0 +1,42 @@
+import pytest
+from app.services.analysis_coalescer import AnalysisCoalescer, coalesce_key
+
+
+def test_coalesce_key_normalizes_the_url():
+    assert coalesce_key("https://Example.com/", "full") == coalesce_key("https://example.com", "full")
+    assert coalesce_key("https://example.com/", "full") != coalesce_key("https://example.com/", "market")
+    assert coalesce_key("https://example.com/", "full") != coalesce_key("https://example.com/", "full", crawl=True)
+
+
+@pytest.mark.asyncio
+async def test_followers_get_the_leaders_result_in_process():
+    coalescer = AnalysisCoalescer(lock_ttl=60)
+
+    assert await coalescer.join("key", "leader") is None
+    assert await coalescer.join("key", "follower") == "leader"
+    assert await coalescer.release("key", "follower") == []
+    assert await coalescer.release("key", "leader") == ["follower"]
+    assert await coalescer.join("key", "next") is None
+
+
+@pytest.mark.asyncio
+async def test_redis_coalescing_across_processes(fake_redis):
+    api = AnalysisCoalescer(lock_ttl=60, local=False)
+    worker = AnalysisCoalescer(lock_ttl=60, local=False)
+
+    assert await api.join("key", "leader") is None
+    assert await api.join("key", "follower") == "leader"
+    # 提交进程不保留 Redis 锁的记录，由 Worker 释放
+    assert api._redis_leaders == {}
+    assert await worker.release("key", "leader") == ["follower"]
+    assert fake_redis.values == {}
+
+
+@pytest.mark.asyncio
+async def test_followers_list_expires_with_the_lock(fake_redis):
+    coalescer = AnalysisCoalescer(lock_ttl=60, local=False)
+
+    await coalescer.join("key", "leader")
+    await coalescer.join("key", "follower")
+
+    assert set(fake_redis.ttls.values()) == {60}
@@ -0,0 +1,90 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+import main
+from app.core.config import settings
+from app.database.database import SessionLocal, AnalysisModel
+from app.models.analysis import AnalysisRequest, AnalysisStatus
+from app.services import analysis_coalescer
+from app.services.content_store import ContentStore
+from app import tasks
+
+URL = "https://shop.example/"
+PAGE = {"url": URL, "title": "Shop", "content": "商品介绍"}
+
+
+@pytest.fixture
+def celery_mode(monkeypatch, tables, fake_redis):
+    monkeypatch.setattr(settings, "CELERY_ENABLED", True)
+    monkeypatch.setattr(settings, "ADMISSION_CHECK_MODE", "get")
+    monkeypatch.setattr(settings, "ANALYSIS_COALESCING_ENABLED", True)
+    monkeypatch.setattr(analysis_coalescer, "_analysis_coalescer", None)
+
+    async def fetch_and_parse(self, url, timeout):
+        self.status_codes[url] = 200
+        self.num_bytes[url] = 1024
+        return PAGE
+
+    monkeypatch.setattr(ContentStore, "_fetch_and_parse", fetch_and_parse)
+    return fake_redis
+
+
+def task_status(task_id):
+    db = SessionLocal()
+    try:
+        return db.query(AnalysisModel).filter(AnalysisModel.task_id == task_id).first().status
+    finally:
+        db.close()
+
+
+@pytest.mark.asyncio
+async def test_submit_forwards_the_admission_page_to_the_worker(monkeypatch, celery_mode):
+    submitted = []
+    monkeypatch.setattr(tasks.prepare_analysis, "apply_async", lambda kwargs: submitted.append(kwargs))
+
+    response = await main.analyze_url(AnalysisRequest(url=URL, analysis_type="full"), None)
+
+    assert response.status == AnalysisStatus.PENDING
+    assert submitted[0]["task_id"] == response.task_id
+    assert submitted[0]["pages"] == {URL: {"page": PAGE, "num_bytes": 1024}}
+
+
+@pytest.mark.asyncio
+async def test_failed_submit_releases_the_lock_and_fails_followers(monkeypatch, celery_mode):
+    request = AnalysisRequest(url=URL, analysis_type="full")
+    lock_key, followers_key = analysis_coalescer.AnalysisCoalescer._redis_keys(
+        analysis_coalescer.coalesce_key(str(request.url), request.analysis_type))
+    follower_id = "follower"
+    main.create_task_record(follower_id, URL, "full")
+    submitted = []
+
+    def broker_down(kwargs):
+        # 提交期间另一个相同的请求已合并到该任务
+        submitted.append(kwargs)
+        celery_mode.lists[followers_key] = [follower_id.encode("utf-8")]
+        raise ConnectionError("broker unavailable")
+
+    monkeypatch.setattr(tasks.prepare_analysis, "apply_async", broker_down)
+    with pytest.raises(HTTPException) as error:
+        await main.analyze_url(request, None)
+
+    assert error.value.status_code == 500
+    assert lock_key not in celery_mode.values
+    assert task_status(submitted[0]["task_id"]) == AnalysisStatus.FAILED
+    assert task_status(follower_id) == AnalysisStatus.FAILED
+
+
+def test_preloaded_pages_are_served_without_fetching(monkeypatch):
+    source = ContentStore()
+    source._pages[URL] = PAGE
+    source.status_codes[URL] = 200
+    source.num_bytes[URL] = 1024
+
+    async def fetch_and_parse(self, url, timeout):
+        raise AssertionError("页面不应重新抓取")
+
+    monkeypatch.setattr(ContentStore, "_fetch_and_parse", fetch_and_parse)
+    store = ContentStore(pages=source.export_pages())
+
+    assert asyncio.run(store.get(URL)) == PAGE
+    assert store.status_codes[URL] == 200
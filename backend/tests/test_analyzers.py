@@ -0,0 +1,65 @@
+import json
+import pytest
+from app.services.analysis_context import AnalysisContext
+from app.services.competitor_analyzer import CompetitorAnalyzer
+from app.services.user_analyzer import UserAnalyzer
+
+ARTIFACTS = {
+    "website_content": {"title": "Example", "description": "", "content": "Example sells tools.",
+                        "user_keywords": [], "competitor_keywords": [], "url": "https://example.com/"},
+    "social_data": {},
+    "industry_info": {}
+}
+
+
+def reply_by_stage(replies):
+    """按提示词中的阶段说明返回回复，未列出的阶段返回空对象"""
+    def reply(prompt):
+        for marker, content in replies.items():
+            if marker in prompt:
+                return content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+        return "{}"
+    return reply
+
+
+@pytest.mark.asyncio
+async def test_unparseable_stage_falls_back_to_its_own_default(fake_openai):
+    fake_openai.reply = staticmethod(reply_by_stage({
+        "分析用户行为模式": "无法提供",
+        "分析目标用户群体": {"target_audience": [{"name": "小型企业"}]},
+        "分析用户需求和痛点": {"needs": ["省时"], "pain_points": ["价格高"]},
+        "分析人口统计学和心理特征": {"demographics": {"age_range": "30-50"}, "psychographics": {}}
+    }))
+    analyzer = UserAnalyzer()
+
+    profile = await analyzer.analyze("https://example.com/", AnalysisContext("https://example.com/", artifacts=ARTIFACTS))
+
+    assert profile.target_audience == [{"name": "小型企业"}]
+    assert profile.user_needs == ["省时"]
+    assert profile.demographics == {"age_range": "30-50"}
+    assert profile.user_behavior == analyzer.fallback_response["user_behavior"]
+
+
+@pytest.mark.asyncio
+async def test_unparseable_competitors_stage_keeps_the_other_stages(fake_openai):
+    fake_openai.reply = staticmethod(reply_by_stage({
+        "识别主要竞争对手": "```无法识别```",
+        "分析竞争格局": {"market_concentration": "低"},
+        "分析竞争优势": {"competitive_advantages": ["渠道"]}
+    }))
+    analyzer = CompetitorAnalyzer()
+
+    analysis = await analyzer.analyze("https://example.com/", AnalysisContext("https://example.com/", artifacts=ARTIFACTS))
+
+    assert [competitor["name"] for competitor in analysis.competitors] == ["主要竞争对手"]
+    assert analysis.competitive_landscape == {"market_concentration": "低"}
+    assert analysis.competitive_advantages == ["渠道"]
+
+
+@pytest.mark.asyncio
+async def test_stage_prompts_carry_their_output_schema(fake_openai):
+    await UserAnalyzer().analyze("https://example.com/", AnalysisContext("https://example.com/", artifacts=ARTIFACTS))
+
+    prompts = [request["messages"][-1]["content"] for client in fake_openai.instances for request in client.requests]
+    behavior = next(prompt for prompt in prompts if "分析用户行为模式" in prompt)
+    assert '"purchase_pattern"' in behavior
@@ -0,0 +1,41 @@
+import pytest
+from category_index import CategoryIndex, DEFAULT_CATEGORY, registered_label
+
+INDEX = CategoryIndex({"apple": "智能手机市场", "amazon": "电商平台市场", "nike": "运动鞋服市场"})
+
+
+@pytest.mark.parametrize("host, expected", [
+    ("www.apple.com", "apple"),
+    ("store.apple.com.cn", "apple"),
+    ("amazon.co.uk", "amazon"),
+    ("localhost", "localhost"),
+])
+def test_registered_label_skips_public_suffixes(host, expected):
+    assert registered_label(host) == expected
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://www.apple.com/iphone", "智能手机市场"),
+    ("amazon.co.uk", "电商平台市场"),
+    ("https://apple.example.com/", "智能手机市场"),
+    ("https://nike-outlet.example.com/", "运动鞋服市场"),
+    ("https://blog.example.com/reviews/nike", "运动鞋服市场"),
+])
+def test_classifies_by_host_then_path(url, expected):
+    assert INDEX.classify(url) == expected
+
+
+@pytest.mark.parametrize("url", [
+    "https://pineapple.com/",
+    "https://example.com/?ref=apple",
+    "https://shop.example.com/",
+    "http://[invalid",
+])
+def test_unrelated_urls_fall_back_to_the_default(url):
+    assert INDEX.classify(url) == DEFAULT_CATEGORY
+
+
+def test_bundled_mapping_loads():
+    index = CategoryIndex.from_file()
+    assert len(index) > 0
+    assert index.classify_many(["https://www.tesla.com", "https://example.org"]) == ["电动汽车市场", DEFAULT_CATEGORY]
@@ -0,0 +1,46 @@
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+from app.database import database
+from app.database.database import AnalysisModel
+from app.models.analysis import AnalysisStatus, AnalysisType
+
+# 新增指纹、分析部分状态和版本号之前的 analyses 表
+OLD_ANALYSES_TABLE = """
+CREATE TABLE analyses (
+    id INTEGER PRIMARY KEY,
+    task_id VARCHAR UNIQUE,
+    url VARCHAR NOT NULL,
+    analysis_type VARCHAR(11),
+    status VARCHAR(10),
+    result JSON,
+    message TEXT,
+    created_at DATETIME,
+    completed_at DATETIME,
+    progress INTEGER
+)
+"""
+
+
+def test_create_tables_upgrades_an_existing_analyses_table(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(OLD_ANALYSES_TABLE))
+        conn.execute(text("INSERT INTO analyses (task_id, url, analysis_type, status, progress) "
+                          "VALUES ('old', 'https://example.com/', 'FULL', 'COMPLETED', 100)"))
+    monkeypatch.setattr(database, "engine", engine)
+
+    database.create_tables()
+    database.create_tables()
+
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("analyses")}
+    assert {"content_hash", "simhash", "sections", "version"} <= columns
+    assert "ix_analyses_url" in {index["name"] for index in inspector.get_indexes("analyses")}
+
+    db = sessionmaker(bind=engine)()
+    try:
+        database.create_analysis_task(db, "new", "https://example.com/", AnalysisType.FULL)
+        database.update_analysis_status(db, "old", AnalysisStatus.COMPLETED, "done")
+        assert db.query(AnalysisModel).filter(AnalysisModel.task_id == "old").one().version == 1
+    finally:
+        db.close()
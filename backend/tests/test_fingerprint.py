@@ -0,0 +1,80 @@
+import uuid
+import pytest
+import main
+from app.database import database
+from app.database.database import SessionLocal
+from app.models.analysis import AnalysisStatus
+from app.services.content_store import ContentStore
+from app.services.fingerprint import compute_fingerprint, hamming_distance
+
+CONTENT = " ".join(f"Feature {i} helps small teams track orders and customers." for i in range(40))
+
+
+def page(content, title="Shop"):
+    return {"title": title, "description": "", "content": content}
+
+
+def distance(a, b):
+    return hamming_distance(int(a["simhash"], 16), int(b["simhash"], 16))
+
+
+def test_layout_changes_keep_the_same_fingerprint():
+    assert compute_fingerprint(page(CONTENT)) == compute_fingerprint(page("  " + CONTENT.upper().replace(" ", "\n")))
+
+
+def test_small_edits_stay_close_and_other_pages_do_not():
+    original = compute_fingerprint(page(CONTENT))
+    edited = compute_fingerprint(page(CONTENT.replace("Feature 7", "Feature seven")))
+    other = compute_fingerprint(page("Fresh roasted coffee beans delivered to your door every week."))
+
+    assert edited["content_hash"] != original["content_hash"]
+    assert distance(original, edited) <= 3
+    assert distance(original, other) > 10
+
+
+def completed_task(url, fingerprint, result):
+    task_id = str(uuid.uuid4())
+    main.create_task_record(task_id, url, "full")
+    main.save_analysis_result(task_id, result, AnalysisStatus.COMPLETED, "分析完成", fingerprint)
+    return task_id
+
+
+def find(url, fingerprint, max_distance=3):
+    db = SessionLocal()
+    try:
+        return database.find_reusable_analysis(db, url, "full", fingerprint, max_distance, 3600)
+    finally:
+        db.close()
+
+
+def test_reuse_matches_same_or_near_content_of_the_same_url(tables):
+    url = f"https://{uuid.uuid4().hex}.example/"
+    original = compute_fingerprint(page(CONTENT))
+    task_id = completed_task(url, original, {"market_trends": {}})
+
+    assert find(url, original).task_id == task_id
+    assert find(url, compute_fingerprint(page(CONTENT.replace("Feature 7", "Feature seven")))).task_id == task_id
+    assert find(url, compute_fingerprint(page("Completely different page about coffee beans."))) is None
+    assert find("https://other.example/", original) is None
+
+
+@pytest.mark.asyncio
+async def test_reused_results_are_not_fingerprinted(tables):
+    url = f"https://{uuid.uuid4().hex}.example/"
+    store = ContentStore(pages={url: {"page": {"url": url, **page(CONTENT)}, "num_bytes": len(CONTENT)}})
+    fingerprint = compute_fingerprint(await store.get_bundle(url))
+    completed_task(url, fingerprint, {"market_trends": {"summary": "cached"}})
+
+    task_id = str(uuid.uuid4())
+    main.create_task_record(task_id, url, "full")
+    await main.perform_analysis(task_id, url, "full", content_store=store)
+
+    db = SessionLocal()
+    try:
+        reused = database.get_analysis_by_task_id(db, task_id)
+        assert reused.status == AnalysisStatus.COMPLETED
+        assert reused.result == {"market_trends": {"summary": "cached"}}
+        # 复用的结果不能再作为复用来源
+        assert reused.simhash is None and reused.content_hash is None
+    finally:
+        db.close()
@@ -0,0 +1,71 @@
+import asyncio
+import os
+import pytest
+from app.services.http_cache import HTTPCache
+
+
+def object_files(cache_dir):
+    return [name for _, _, names in os.walk(os.path.join(cache_dir, "objects")) for name in names]
+
+
+@pytest.mark.asyncio
+async def test_processes_sharing_a_directory_keep_each_others_entries(tmp_path):
+    api = HTTPCache(str(tmp_path), max_bytes=1024, ttl=60)
+    worker = HTTPCache(str(tmp_path), max_bytes=1024, ttl=60)
+
+    await api.store("https://a.example/", "page a", {})
+    await worker.store("https://b.example/", "page b", {})
+
+    reloaded = HTTPCache(str(tmp_path), max_bytes=1024, ttl=60)
+    assert set(reloaded._entries) == {"https://a.example/", "https://b.example/"}
+    assert api.lookup("https://b.example/") is not None
+    assert await api.read_body("https://b.example/", api.lookup("https://b.example/")) == "page b"
+
+
+@pytest.mark.asyncio
+async def test_eviction_counts_entries_written_by_other_processes(tmp_path):
+    api = HTTPCache(str(tmp_path), max_bytes=10, ttl=60)
+    worker = HTTPCache(str(tmp_path), max_bytes=10, ttl=60)
+
+    await api.store("https://a.example/", "aaaaaa", {})
+    await worker.store("https://b.example/", "bbbbbb", {})
+
+    assert list(HTTPCache(str(tmp_path), max_bytes=10, ttl=60)._entries) == ["https://b.example/"]
+    assert len(object_files(str(tmp_path))) == 1
+    assert api.lookup("https://a.example/") is None
+
+
+@pytest.mark.asyncio
+async def test_eviction_keeps_objects_still_referenced(tmp_path):
+    cache = HTTPCache(str(tmp_path), max_bytes=9, ttl=60)
+
+    await cache.store("https://a.example/", "same", {})
+    await cache.store("https://c.example/", "other!", {})
+    await cache.store("https://b.example/", "same", {})
+
+    assert list(cache._entries) == ["https://b.example/"]
+    assert await cache.read_body("https://b.example/", cache.lookup("https://b.example/")) == "same"
+
+
+@pytest.mark.asyncio
+async def test_revalidation_does_not_restore_an_evicted_entry(tmp_path):
+    api = HTTPCache(str(tmp_path), max_bytes=1024, ttl=60)
+    worker = HTTPCache(str(tmp_path), max_bytes=1024, ttl=60)
+    await api.store("https://a.example/", "page a", {"etag": '"1"'})
+    entry = dict(api.lookup("https://a.example/"))
+
+    worker.discard("https://a.example/")
+    await worker.store("https://b.example/", "page b", {})
+    await api.revalidated("https://a.example/", entry, {"etag": '"2"'})
+
+    assert api.lookup("https://a.example/") is None
+
+
+def test_cache_is_usable_from_successive_event_loops(tmp_path):
+    # Celery Worker 中每个任务在新的事件循环中运行
+    cache = HTTPCache(str(tmp_path), max_bytes=1024, ttl=60)
+
+    asyncio.run(cache.store("https://a.example/", "page a", {}))
+    asyncio.run(cache.store("https://b.example/", "page b", {}))
+
+    assert set(cache._entries) == {"https://a.example/", "https://b.example/"}
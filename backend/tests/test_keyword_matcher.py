@@ -0,0 +1,34 @@
+import pytest
+from app.services.keyword_matcher import KeywordMatcher, get_keyword_matcher
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Apple vs Samsung", ["vs"]),
+    ("Paint on canvas", []),
+    ("Our customers love it", ["customer"]),
+    ("Boxes and boxes", ["box"]),
+    ("customerservice", []),
+    ("e-commerce platform", ["commerce", "platform"]),
+])
+def test_english_keywords_match_on_word_boundaries(text, expected):
+    matcher = KeywordMatcher(["vs", "customer", "box", "commerce", "platform"])
+    assert matcher.present(text) == expected
+
+
+def test_chinese_keywords_match_inside_text():
+    matcher = KeywordMatcher(["竞争", "市场"])
+    assert matcher.present("北美市场竞争激烈") == ["竞争", "市场"]
+
+
+def test_overlapping_keywords_are_all_found():
+    matcher = KeywordMatcher(["smart", "smart home", "home"])
+    matches = matcher.find_all("A Smart Home hub")
+
+    assert [(m.keyword, m.start, m.end) for m in matches] == [
+        ("smart", 2, 7), ("smart home", 2, 12), ("home", 8, 12)
+    ]
+    assert matcher.count("home, HOME and homes") == {"home": 3}
+
+
+def test_matchers_are_cached_per_vocabulary():
+    assert get_keyword_matcher(("a", "b")) is get_keyword_matcher(("a", "b"))
@@ -0,0 +1,44 @@
+import asyncio
+import threading
+import pytest
+from app.services import llm_gateway
+from app.services.llm_gateway import LLMGateway
+
+
+@pytest.mark.asyncio
+async def test_complete_sends_one_non_streaming_request(fake_openai):
+    gateway = LLMGateway(max_concurrency=2, timeout=5)
+
+    assert await gateway.complete("prompt", "system") == "reply"
+
+    [request] = fake_openai.instances[0].requests
+    assert "stream" not in request
+    assert request["messages"][-1] == {"role": "user", "content": "prompt"}
+
+
+def test_worker_tasks_close_the_client_of_each_event_loop(fake_openai):
+    from app.tasks import _run
+    gateway = llm_gateway.get_llm_gateway()
+
+    for _ in range(2):
+        assert _run(gateway.complete("prompt", "system")) == "reply"
+
+    assert len(fake_openai.instances) == 2
+    assert all(client.closed for client in fake_openai.instances)
+
+
+def test_client_of_a_running_loop_is_closed_on_that_loop(fake_openai):
+    gateway = LLMGateway(max_concurrency=2, timeout=5)
+    other_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        asyncio.run_coroutine_threadsafe(gateway.complete("prompt", "system"), other_loop).result(5)
+        asyncio.run(gateway.complete("prompt", "system"))
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0), other_loop).result(5)
+    finally:
+        other_loop.call_soon_threadsafe(other_loop.stop)
+        thread.join(5)
+        other_loop.close()
+
+    assert fake_openai.instances[0].closed
@@ -0,0 +1,53 @@
+import asyncio
+import time
+import pytest
+import main
+from app.core.config import settings
+from app.models.analysis import AnalysisStatus
+
+
+@pytest.fixture
+def task_id(tables):
+    task_id = f"poll-{time.monotonic_ns()}"
+    main.create_task_record(task_id, "https://shop.example/", "full")
+    return task_id
+
+
+@pytest.mark.asyncio
+async def test_returns_at_once_when_the_client_is_behind(task_id):
+    started = time.monotonic()
+    response = await main.get_analysis_status(task_id, wait=5, since_version=-1)
+
+    assert time.monotonic() - started < 1
+    assert response.version == 0
+
+
+@pytest.mark.asyncio
+async def test_returns_when_the_status_changes(task_id):
+    current = (await main.get_analysis_status(task_id, wait=None, since_version=None)).version
+
+    async def update_later():
+        await asyncio.sleep(0.2)
+        main.update_task_status(task_id, AnalysisStatus.PROCESSING, "正在分析市场趋势...")
+
+    updater = asyncio.create_task(update_later())
+    started = time.monotonic()
+    response = await main.get_analysis_status(task_id, wait=5, since_version=current)
+    await updater
+
+    assert time.monotonic() - started < 2
+    assert response.version == current + 1
+    assert response.message == "正在分析市场趋势..."
+
+
+@pytest.mark.asyncio
+async def test_unchanged_status_is_returned_after_the_wait(monkeypatch, task_id):
+    monkeypatch.setattr(settings, "LONG_POLL_MAX_WAIT", 0.2)
+    current = (await main.get_analysis_status(task_id, wait=None, since_version=None)).version
+
+    started = time.monotonic()
+    response = await main.get_analysis_status(task_id, wait=25, since_version=current)
+
+    # 等待时间受 LONG_POLL_MAX_WAIT 限制，版本号不变，前端据此按最小间隔轮询
+    assert 0.2 <= time.monotonic() - started < 2
+    assert response.version == current
@@ -0,0 +1,38 @@
+import asyncio
+import threading
+import pytest
+import production
+from analysis_engine import analysis_engine
+
+
+@pytest.mark.asyncio
+async def test_status_shows_each_analysis_stage(monkeypatch):
+    release = threading.Event()
+    generate_user_profiles = analysis_engine.generate_user_profiles
+
+    def blocked_user_profiles(category):
+        release.wait(5)
+        return generate_user_profiles(category)
+
+    monkeypatch.setattr(analysis_engine, "generate_user_profiles", blocked_user_profiles)
+    response = await production.analyze_url({"url": "https://www.apple.com"})
+    task_id = response["task_id"]
+
+    for _ in range(100):
+        status = await production.get_analysis_result(task_id)
+        if status.get("stage") == "user_profiles":
+            break
+        await asyncio.sleep(0.01)
+    release.set()
+
+    assert status["status"] == "processing"
+    assert status["stage"] == "user_profiles"
+    assert status["message"] == "正在分析用户画像..."
+    assert status["progress"] == 40
+
+    for _ in range(100):
+        status = await production.get_analysis_result(task_id)
+        if status["status"] != "processing":
+            break
+        await asyncio.sleep(0.01)
+    assert status["status"] == "completed"
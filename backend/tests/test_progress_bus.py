@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import time
+import pytest
+from app.services import progress_bus
+from app.services.progress_bus import ProgressBus
+
+
+def event(version, status="processing"):
+    return {"task_id": "task", "version": version, "status": status}
+
+
+class DownRedis:
+    """连接超时后报错的 Redis 替身"""
+
+    def __init__(self):
+        self.failed = threading.Event()
+
+    def publish(self, channel, payload):
+        time.sleep(0.5)
+        raise ConnectionError("redis is down")
+
+
+@pytest.mark.asyncio
+async def test_publish_does_not_wait_for_unavailable_redis(monkeypatch):
+    redis = DownRedis()
+    monkeypatch.setattr(progress_bus, "get_sync_redis", lambda: redis)
+    monkeypatch.setattr(progress_bus, "mark_redis_failed", redis.failed.set)
+    bus = ProgressBus()
+
+    async with bus.subscribe("task") as queue:
+        started = time.monotonic()
+        bus.publish(event(1))
+        bus.publish(event(2))
+        elapsed = time.monotonic() - started
+
+        assert elapsed < 0.1
+        assert (await asyncio.wait_for(queue.get(), 1))["version"] == 1
+        assert (await asyncio.wait_for(queue.get(), 1))["version"] == 2
+    assert await asyncio.to_thread(redis.failed.wait, 2)
+
+
+@pytest.mark.asyncio
+async def test_watch_yields_newer_states_until_the_task_ends():
+    bus = ProgressBus()
+    states = {"current": event(3)}
+
+    async def publish_later():
+        await asyncio.sleep(0.05)
+        bus.publish(event(2))
+        bus.publish(event(4))
+        bus.publish(event(5, "completed"))
+
+    publisher = asyncio.ensure_future(publish_later())
+    seen = [state["version"] async for state in bus.watch("task", lambda: states["current"], since_version=2)]
+    await publisher
+
+    assert seen == [3, 4, 5]
+
+
+@pytest.mark.asyncio
+async def test_watch_returns_a_finished_task_at_once():
+    bus = ProgressBus()
+
+    seen = [state async for state in bus.watch("task", lambda: event(7, "completed"), since_version=7, heartbeat=5)]
+
+    assert seen == []
@@ -0,0 +1,76 @@
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from app.services import prompt_builder
+from app.services.analysis_context import AnalysisContext
+from app.services.prompt_builder import count_tokens, dedupe_sentences, load_token_encoding, JsonContext
+
+
+class WordEncoding:
+    def encode(self, text):
+        return text.split()
+
+
+@pytest.fixture
+def slow_tiktoken(monkeypatch):
+    """编码文件下载很慢的 tiktoken 替身，release 后完成加载"""
+    release = threading.Event()
+
+    def encoding_for_model(model):
+        release.wait(5)
+        return WordEncoding()
+
+    monkeypatch.setattr(prompt_builder, "tiktoken", SimpleNamespace(encoding_for_model=encoding_for_model))
+    monkeypatch.setattr(prompt_builder, "_encoding", None)
+    return release
+
+
+def test_loading_the_encoding_is_bounded_by_the_timeout(slow_tiktoken):
+    started = time.monotonic()
+    assert load_token_encoding(timeout=0.1) is False
+    assert time.monotonic() - started < 1
+    # 加载完成前按字符估算
+    assert count_tokens("one two three four") == 5
+
+    slow_tiktoken.set()
+    for _ in range(100):
+        if prompt_builder._encoding is not None:
+            break
+        time.sleep(0.01)
+    assert count_tokens("one two three four") == 4
+
+
+def test_count_tokens_never_loads_the_encoding(slow_tiktoken):
+    started = time.monotonic()
+    assert count_tokens("市场分析") == 4
+    assert time.monotonic() - started < 0.5
+
+
+def test_dedupe_sentences_drops_repeated_navigation():
+    page = "Home. Pricing. Our tools save time.\nHome. Pricing. Contact us."
+    assert dedupe_sentences(page) == "Home. Pricing. Our tools save time. Contact us."
+
+
+@pytest.mark.asyncio
+async def test_website_content_is_deduplicated_once_for_all_stages():
+    class Store:
+        calls = 0
+
+        async def get_bundle(self, url):
+            Store.calls += 1
+            return {"title": "t", "description": "d", "content": "Home. Home. Tools.",
+                    "keywords": {"user": [], "competitor": []}}
+
+    context = AnalysisContext("https://example.com/", Store())
+    first, second = await context.get("website_content"), await context.get("website_content")
+
+    assert first is second
+    assert first["content"] == "Home. Tools."
+    assert Store.calls == 1
+
+
+def test_json_context_drops_empty_values_and_unused_fields():
+    competitors = [{"name": "A", "description": "tools", "website": "", "market_share": None, "founded": 1999}]
+
+    assert JsonContext(competitors, ("name", "description", "website", "market_share")).text == '[{"name":"A","desc":"tools"}]'
@@ -0,0 +1,54 @@
+import pytest
+from app.services.prompt_builder import build_prompt, count_tokens, Excerpt
+from app.services.structured_output import (
+    parse_json, request_json, object_schema, StructuredOutputError, STRING_LIST_SCHEMA
+)
+
+
+@pytest.mark.parametrize("text", [
+    '{"a": [1, 2]}',
+    '```json\n{"a": [1, 2]}\n```',
+    '结果如下：{"a": [1, 2],} 以上。',
+    '{“a”: [1, 2]}',
+])
+def test_parse_json_repairs_common_model_output(text):
+    assert parse_json(text) == {"a": [1, 2]}
+
+
+def test_parse_json_rejects_output_without_json():
+    with pytest.raises(StructuredOutputError):
+        parse_json("抱歉，我无法完成这个请求。")
+
+
+class FakeGateway:
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.prompts = []
+
+    async def complete(self, prompt, system_prompt, validate=None, json_mode=False):
+        self.prompts.append(prompt)
+        reply = self.replies.pop(0)
+        validate(reply)
+        return reply
+
+
+@pytest.mark.asyncio
+async def test_request_json_retries_unparseable_output_once():
+    gateway = FakeGateway("not json", '{"ok": true}')
+
+    assert await request_json(gateway, "prompt", "system", retries=1) == {"ok": True}
+    assert gateway.prompts == ["prompt", "prompt"]
+
+    with pytest.raises(StructuredOutputError):
+        await request_json(FakeGateway("not json", "still not json"), "prompt", "system", retries=1)
+
+
+def test_build_prompt_counts_the_schema_in_the_budget():
+    schema = object_schema(**{f"field_{index}": STRING_LIST_SCHEMA for index in range(20)})
+    page = "这是一段很长的网页正文。" * 400
+
+    prompt = build_prompt("test", "网站内容: {content}", max_tokens=600, schema=schema,
+                          content=Excerpt(page, 5000))
+
+    assert count_tokens(prompt) <= 600
+    assert prompt.endswith('"required":[' + ",".join(f'"field_{index}"' for index in range(20)) + "]}")